@@ -2,10 +2,48 @@
 # For license information, please see license.txt
 
 import frappe
+import hashlib
 import json
 from frappe import _
 from frappe.utils import flt, cint, nowdate
 
+from custom_order_workflow.conversion import (
+    ConversionContext,
+    get_bulk_conversion_summary,
+    get_conversion_skip_reason,
+    start_bulk_conversion,
+)
+from custom_order_workflow.permissions import get_permission_scope
+from custom_order_workflow.report_cache import bump_data_version, get_data_version
+from custom_order_workflow.rollup import apply_rollup_delta, get_rollup_entry
+from custom_order_workflow.transitions import log_transition
+
+# Cache key prefix of dashboard status totals, per data version and permission scope
+DASHBOARD_STATS_KEY = 'custom_order_workflow:dashboard_stats'
+
+# Seconds totals of one data version are kept. Writes through the Pre-Quotation
+# hooks move readers to a new key; the short expiry bounds staleness after writes
+# that bypass them, such as db_set from other apps or patches
+DASHBOARD_STATS_TTL = 5 * 60
+
+# Funnel stages of get_conversion_metrics and the status reaching each one
+CONVERSION_STAGES = (
+    ('draft', 'Draft'),
+    ('submitted', 'Submitted to Manufacturing'),
+    ('costed', 'Costing Done'),
+    ('approved', 'Approved Internally'),
+    ('quotation_created', 'Converted to Quotation')
+)
+
+# Seconds a versioned Pre-Quotation payload is kept; newer versions get new keys
+PAYLOAD_CACHE_TTL = 60 * 60
+
+# Pre-Quotation methods served by get_versioned_payload
+VERSIONED_PAYLOADS = {
+    'pricing_summary': 'get_pricing_summary',
+    'quotation_preview': 'generate_quotation_preview'
+}
+
 @frappe.whitelist()
 def create_quotation_from_pre_quotation(pre_quotation_name):
     """
@@ -19,36 +57,42 @@ def create_quotation_from_pre_quotation(pre_quotation_name):
     """
     try:
         # Get pre-quotation
-        pre_quotation = frappe.get_doc(\'Pre-Quotation\', pre_quotation_name)
+        pre_quotation = frappe.get_doc('Pre-Quotation', pre_quotation_name)
         
         if pre_quotation.docstatus != 1:
             frappe.throw(_("Pre-Quotation must be submitted before creating quotation"))
         
         # Create quotation
-        quotation = frappe.new_doc(\'Quotation\')
-        quotation.quotation_to = \'Customer\'
+        quotation = frappe.new_doc('Quotation')
+        quotation.quotation_to = 'Customer'
         quotation.party_name = pre_quotation.customer
         quotation.transaction_date = nowdate()
         quotation.valid_till = pre_quotation.valid_until
         
+        # Resolve and create all item masters in one go
+        item_codes = create_items_from_pre_quotation_items(pre_quotation.custom_furniture_items)
+        
         # Add items
-        for item in pre_quotation.custom_furniture_items:
-            # Create item if it doesn\'t exist
-            item_code = create_item_from_pre_quotation_item(item)
-            
-            quotation_item = quotation.append(\'items\')
+        for item, item_code in zip(pre_quotation.custom_furniture_items, item_codes):
+            quotation_item = quotation.append('items')
             quotation_item.item_code = item_code
             quotation_item.item_name = item.item_name
-            quotation_item.description = item.item_description
+            quotation_item.description = item.description
             quotation_item.qty = item.quantity
-            quotation_item.uom = item.unit
+            quotation_item.uom = item.uom
             quotation_item.rate = item.selling_price_per_unit
             quotation_item.amount = item.total_selling_amount
         
         quotation.insert()
         
-        # Update pre-quotation status
-        pre_quotation.db_set(\'status\', \'Converted to Quotation\')
+        # Update pre-quotation status; db_set skips the doc events, so update the rollup and transition log here
+        previous_rollup_entry = get_rollup_entry(pre_quotation)
+        previous_status = pre_quotation.status
+        pre_quotation.db_set('status', 'Converted to Quotation')
+        apply_rollup_delta(previous_rollup_entry, get_rollup_entry(pre_quotation))
+        if previous_status != pre_quotation.status:
+            log_transition(pre_quotation, previous_status)
+        bump_data_version()
         
         return quotation.name
         
@@ -56,6 +100,50 @@ def create_quotation_from_pre_quotation(pre_quotation_name):
         frappe.log_error(f"Create Quotation Error: {str(e)}")
         frappe.throw(_("Error creating quotation: {0}").format(str(e)))
 
+def get_item_code(pre_quotation_item):
+    """Item code used for a Pre-Quotation Item row"""
+    return f"CUSTOM-{pre_quotation_item.item_name.upper().replace(' ', '-')}"
+
+def create_items_from_pre_quotation_items(pre_quotation_items, context=None):
+    """
+    Create ERPNext Items for Pre-Quotation Item rows that have none yet
+    
+    Existing items are looked up in one query and each missing one is
+    inserted once.
+    
+    Args:
+        pre_quotation_items: Pre-Quotation Item child table rows
+        context (ConversionContext): Shared conversion lookups, optional
+        
+    Returns:
+        list: Item code for each row
+    """
+    context = context or ConversionContext()
+    item_defaults = [{
+        'company': context.company,
+        'default_warehouse': context.default_warehouse
+    }]
+    
+    item_codes = []
+    item_rows = []
+    for pre_quotation_item in pre_quotation_items:
+        item_code = get_item_code(pre_quotation_item)
+        item_codes.append(item_code)
+        item_rows.append({
+            'item_code': item_code,
+            'item_name': pre_quotation_item.item_name,
+            'description': pre_quotation_item.description,
+            'stock_uom': pre_quotation_item.uom,
+            'include_item_in_manufacturing': 1,
+            'valuation_rate': pre_quotation_item.cost_per_unit or 0,
+            'image': pre_quotation_item.attached_image,
+            'item_defaults': item_defaults
+        })
+    
+    context.ensure_items(item_rows)
+    
+    return item_codes
+
 def create_item_from_pre_quotation_item(pre_quotation_item):
     """
     Create ERPNext Item from Pre-Quotation Item
@@ -67,36 +155,230 @@ def create_item_from_pre_quotation_item(pre_quotation_item):
         str: Item code
     """
     try:
-        # Generate item code
-        item_code = f"CUSTOM-{pre_quotation_item.item_name.upper().replace(\' \', \'-\')}"
-        
-        # Check if item already exists
-        if frappe.db.exists(\'Item\', item_code):
-            return item_code
-        
-        # Create new item
-        item = frappe.new_doc(\'Item\')
-        item.item_code = item_code
-        item.item_name = pre_quotation_item.item_name
-        item.description = pre_quotation_item.item_description
-        item.item_group = \'Custom Furniture\'  # Create this item group if needed
-        item.stock_uom = pre_quotation_item.unit
-        item.is_stock_item = 1
-        item.include_item_in_manufacturing = 1
-        item.valuation_rate = pre_quotation_item.material_cost or 0
-        
-        # Set item defaults
-        item.append(\'item_defaults\', {
-            \'company\': frappe.defaults.get_user_default(\'Company\'),
-            \'default_warehouse\': frappe.db.get_single_value(\'Stock Settings\', \'default_warehouse\')
-        })
-        
-        item.insert()
-        
-        return item.item_code
+        return create_items_from_pre_quotation_items([pre_quotation_item])[0]
         
     except Exception as e:
         frappe.log_error(f"Create Item Error: {str(e)}")
         return None
 
+@frappe.whitelist()
+def bulk_create_quotations(names=None, filters=None, workers=None):
+    """
+    Create Quotations for many Pre-Quotations in background jobs
+    
+    Pre-Quotations that already have a Quotation are skipped, so the same
+    selection can safely be submitted again.
+    
+    Args:
+        names (list): Pre-Quotation names, optional
+        filters (dict): Pre-Quotation filters, used when no names are given
+        workers (int): Maximum number of parallel conversion jobs
+        
+    Returns:
+        dict: Batch id and the documents queued or skipped
+    """
+    frappe.has_permission('Quotation', 'create', throw=True)
+    # The jobs create missing Items without further permission checks
+    frappe.has_permission('Item', 'create', throw=True)
+    
+    names = frappe.parse_json(names) if names else None
+    filters = frappe.parse_json(filters) if filters else {}
+    
+    if names:
+        filters = {'name': ['in', names]}
+    elif not filters:
+        filters = {'status': 'Converted to Quotation', 'docstatus': 1}
+    
+    pre_quotations = frappe.get_list(
+        'Pre-Quotation',
+        filters=filters,
+        fields=['name', 'status', 'quotation'],
+        limit_page_length=0
+    )
+    
+    # Quotations already linked, looked up once for the whole selection
+    linked = [d.quotation for d in pre_quotations if d.quotation]
+    existing = set(frappe.get_all('Quotation', filters={'name': ['in', linked]}, pluck='name')) if linked else set()
+    
+    queued = []
+    skipped = {}
+    for d in pre_quotations:
+        reason = get_conversion_skip_reason(d, existing)
+        if reason:
+            skipped[d.name] = reason
+        else:
+            queued.append(d.name)
+    
+    batch_id = start_bulk_conversion(queued, skipped, workers=cint(workers) or None)
+    
+    return {
+        'batch_id': batch_id,
+        'queued': queued,
+        'skipped': skipped
+    }
+
+@frappe.whitelist()
+def get_bulk_quotation_status(batch_id):
+    """
+    Get the per-document summary of a bulk quotation conversion
+    
+    Args:
+        batch_id (str): Id returned by bulk_create_quotations
+        
+    Returns:
+        dict: Totals and the result of every document
+    """
+    summary = get_bulk_conversion_summary(batch_id)
+    
+    if not summary or (summary['user'] != frappe.session.user and 'System Manager' not in frappe.get_roles()):
+        frappe.throw(_("Bulk conversion {0} not found").format(batch_id))
+    
+    return summary
 
+@frappe.whitelist()
+def get_pre_quotation_stats():
+    """
+    Get the Pre-Quotation counts and value shown on the Sales Workspace
+    
+    Returns:
+        dict: Total, pending costing and approved counts, and total selling value
+    """
+    totals = get_status_totals()
+    
+    return {
+        'total_pre_quotations': sum(row['count'] for row in totals.values()),
+        'pending_costing': totals.get('Submitted to Manufacturing', {}).get('count', 0),
+        'approved': totals.get('Approved Internally', {}).get('count', 0),
+        'total_value': flt(sum(row['value'] for row in totals.values()), 2)
+    }
+
+@frappe.whitelist()
+def get_conversion_metrics():
+    """
+    Get the Pre-Quotation conversion funnel shown on the Sales Workspace
+    
+    Each stage counts the Pre-Quotations that reached it, i.e. whose status
+    is that stage or a later one. Rejected and cancelled ones are left out.
+    
+    Returns:
+        dict: Count per funnel stage and the overall conversion rate
+    """
+    totals = get_status_totals()
+    
+    metrics = {}
+    reached = 0
+    for stage, status in reversed(CONVERSION_STAGES):
+        reached += totals.get(status, {}).get('count', 0)
+        metrics[stage] = reached
+    
+    metrics['conversion_rate'] = flt(metrics['quotation_created'] * 100 / metrics['draft'], 2) if metrics['draft'] else 0
+    
+    return metrics
+
+def get_status_totals():
+    """
+    Count and selling value of the Pre-Quotations the user can read, per status
+    
+    One grouped query, cached per permission scope under the current data
+    version, so any Pre-Quotation write makes the next read recompute.
+    
+    Returns:
+        dict: Status -> {'count', 'value'}
+    """
+    key = '{0}:{1}:{2}'.format(DASHBOARD_STATS_KEY, get_data_version(), get_permission_scope())
+    totals = frappe.cache().get_value(key)
+    if totals is not None:
+        return totals
+    
+    rows = frappe.get_list(
+        'Pre-Quotation',
+        filters={'docstatus': ['<', 2]},
+        fields=['status', 'count(name) as count', 'sum(estimated_selling_price) as value'],
+        group_by='status',
+        order_by=None
+    )
+    totals = {row.status: {'count': row.count, 'value': flt(row.value)} for row in rows}
+    
+    frappe.cache().set_value(key, totals, expires_in_sec=DASHBOARD_STATS_TTL)
+    
+    return totals
+
+@frappe.whitelist()
+def get_pricing_summary(name, version=None):
+    """
+    Get the pricing summary of a Pre-Quotation, for polling clients
+    
+    Args:
+        name (str): Pre-Quotation name
+        version (str): Version token of the summary the client already has
+        
+    Returns:
+        dict: Version token, and the summary unless it is still the client's
+    """
+    return get_versioned_payload('pricing_summary', name, version)
+
+@frappe.whitelist()
+def get_quotation_preview(name, version=None):
+    """
+    Get the quotation preview of a Pre-Quotation, for polling clients
+    
+    Args:
+        name (str): Pre-Quotation name
+        version (str): Version token of the preview the client already has
+        
+    Returns:
+        dict: Version token, and the preview unless it is still the client's
+    """
+    return get_versioned_payload('quotation_preview', name, version)
+
+def get_versioned_payload(payload, name, version=None):
+    """
+    Payload of a Pre-Quotation, cached on its (name, modified)
+    
+    An unchanged document costs one permission-checked query: the payload is
+    read from cache, or skipped entirely when the client's token still
+    matches. The token is also accepted as an If-None-Match header and sent
+    back as the ETag header.
+    
+    Returns:
+        dict: {'version', 'not_modified'} and 'data' when modified
+    """
+    rows = frappe.get_list('Pre-Quotation', filters={'name': name}, fields=['modified'], limit_page_length=1)
+    if not rows:
+        frappe.throw(_("Pre-Quotation {0} not found").format(name), frappe.PermissionError)
+    
+    token = get_payload_version(payload, name, rows[0].modified)
+    set_etag(token)
+    client_version = version or get_if_none_match()
+    if client_version == token:
+        return {'version': token, 'not_modified': True}
+    
+    key = f'custom_order_workflow:pre_quotation_payload:{token}'
+    data = frappe.cache().get_value(key)
+    if data is None:
+        doc = frappe.get_doc('Pre-Quotation', name)
+        data = getattr(doc, VERSIONED_PAYLOADS[payload])()
+        frappe.cache().set_value(key, data, expires_in_sec=PAYLOAD_CACHE_TTL)
+    
+    return {'version': token, 'not_modified': False, 'data': data}
+
+def get_if_none_match():
+    # There is no request when called from a background job or a test
+    if not getattr(frappe.local, 'request', None):
+        return ''
+    
+    return (frappe.get_request_header('If-None-Match') or '').strip('"')
+
+def set_etag(token):
+    # Response headers only exist while serving a request
+    headers = getattr(frappe.local, 'response_headers', None)
+    if headers is not None:
+        headers.set('ETag', f'"{token}"')
+
+def get_payload_version(payload, name, modified):
+    # The preview is dated today, so it changes with the date too
+    key = [payload, name, str(modified)]
+    if payload == 'quotation_preview':
+        key.append(nowdate())
+    
+    return hashlib.md5(frappe.as_json(key).encode()).hexdigest()
@@ -0,0 +1,141 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+"""Benchmark for the learned cost estimator.
+
+Run on any site:
+
+    bench --site <site> execute custom_order_workflow.benchmarks.cost_estimator.execute \
+        --kwargs "{'rows': 1000000, 'document_rows': 500, 'from_database': True, 'results_path': 'cost.json'}"
+
+Synthetic costed rows with known per-feature costs are generated in memory
+and fed to the trainer as the database stream would, so the timings cover
+encoding and fitting but not reading the rows from MariaDB. Prediction is
+timed for a whole document in one call, and the fitted costs are checked
+against the ones the rows were generated from. With from_database, training
+on the site's own costed history through iter_training_rows is timed too,
+streaming included. Nothing is written to the site; with results_path the
+measurements are written as JSON.
+"""
+
+import json
+import random
+import time
+
+import frappe
+
+from custom_order_workflow.costing.history import CATEGORY_ATTRIBUTES
+from custom_order_workflow.costing.model import iter_training_rows, train_cost_estimator
+
+MATERIALS = ("Oak", "Walnut", "Beech", "Glass", "Laminate", "Marble")
+FINISHES = ("Matt", "Gloss", "Oiled", "Lacquered")
+LEGS = ("Steel", "Aluminium", "Wood")
+CHAIR_MODELS = tuple(f"Model {i}" for i in range(40))
+UPHOLSTERY = ("Mesh", "Fabric", "Leather", "Vinyl")
+ARMRESTS = ("Fixed", "Adjustable", "None")
+BASES = ("Caster", "Sled", "Swivel")
+
+# Costs the synthetic rows are generated from
+TABLE_BASE_COST = 120
+TABLE_COST_PER_SQM = 250
+MATERIAL_COSTS = {material: 40 * i for i, material in enumerate(MATERIALS)}
+CHAIR_BASE_COST = 60
+UPHOLSTERY_COSTS = {material: 25 * i for i, material in enumerate(UPHOLSTERY)}
+
+
+def execute(rows=1000000, document_rows=500, runs=3, seed=7, from_database=False, results_path=None):
+    rng = random.Random(seed)
+    results = {"rows": rows, "document_rows": document_rows}
+
+    start = time.perf_counter()
+    estimator = train_cost_estimator(iter_rows(rows, rng))
+    results["train_seconds"] = time.perf_counter() - start
+    print(f"train {rows:>9} rows  {results['train_seconds']:9.2f} s")
+
+    results["models"] = {}
+    for item_type, model in estimator.models.items():
+        print(f"  {item_type:<6} {model['rows']:>9} rows  rmse {model['rmse']:8.2f}  {len(model['coefficients'])} features")
+        results["models"][item_type] = {"rows": model["rows"], "rmse": model["rmse"]}
+
+    if from_database:
+        start = time.perf_counter()
+        stored = train_cost_estimator(iter_training_rows())
+        results["database_train_seconds"] = time.perf_counter() - start
+        results["database_rows"] = sum(model["rows"] for model in stored.models.values())
+        print(f"train {results['database_rows']:>9} rows from the database  {results['database_train_seconds']:9.2f} s")
+
+    item_types, specifications = [], []
+    for row in iter_rows(document_rows, rng):
+        item_types.append(row[0])
+        specifications.append(as_specification(row))
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predictions = estimator.predict(item_types, specifications)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    results["predict_ms"] = timings[len(timings) // 2] * 1000
+    print(f"predict {document_rows:>7} rows  median {results['predict_ms']:9.2f} ms")
+
+    errors = [
+        abs(prediction - expected_cost(item_type, specification))
+        for item_type, specification, prediction in zip(item_types, specifications, predictions)
+        if prediction is not None
+    ]
+    results["mean_absolute_error"] = sum(errors) / len(errors)
+    print(f"mean absolute error against generating costs {results['mean_absolute_error']:.2f}")
+
+    if results_path:
+        with open(results_path, "w") as f:
+            json.dump(results, f, indent=1)
+
+    return results
+
+
+def iter_rows(count, rng):
+    """(item_type, cost_per_unit, *CATEGORY_ATTRIBUTES, *DIMENSIONS) rows like iter_training_rows"""
+
+    for _ in range(count):
+        if rng.random() < 0.5:
+            specification = frappe._dict(
+                material_top=rng.choice(MATERIALS),
+                finish_top=rng.choice(FINISHES),
+                material_legs=rng.choice(LEGS),
+                length=rng.randrange(80, 320, 10),
+                width=rng.randrange(60, 140, 10),
+                height=rng.choice((72, 75, 105)),
+            )
+            item_type = "Table"
+        else:
+            specification = frappe._dict(
+                chair_model=rng.choice(CHAIR_MODELS),
+                upholstery_material=rng.choice(UPHOLSTERY),
+                armrests=rng.choice(ARMRESTS),
+                base_type=rng.choice(BASES),
+            )
+            item_type = "Chair"
+
+        cost = expected_cost(item_type, specification) + rng.gauss(0, 15)
+        yield (
+            item_type,
+            max(cost, 1),
+            *(specification.get(attribute) for attribute in CATEGORY_ATTRIBUTES),
+            specification.get("length"),
+            specification.get("width"),
+            specification.get("height"),
+        )
+
+
+def as_specification(row):
+    values = row[2:]
+    return frappe._dict(zip((*CATEGORY_ATTRIBUTES, "length", "width", "height"), values))
+
+
+def expected_cost(item_type, specification):
+    if item_type == "Table":
+        area = specification.length * specification.width / 10000
+        return TABLE_BASE_COST + TABLE_COST_PER_SQM * area + MATERIAL_COSTS[specification.material_top]
+
+    return CHAIR_BASE_COST + UPHOLSTERY_COSTS[specification.upholstery_material]
@@ -0,0 +1,158 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+"""Benchmark for the Pre-Quotation Summary report.
+
+Run on a scratch site:
+
+    bench --site <site> execute custom_order_workflow.benchmarks.pre_quotation_summary.execute \
+        --kwargs "{'pre_quotations': 500000, 'items_per_pre_quotation': 20, 'results_path': 'summary.json'}"
+
+Synthetic Pre-Quotations and items are bulk inserted and committed so the
+timings see real table sizes, the report is timed for each filter
+combination, in full and for its first page, together with its query
+plan, and the rows are removed again. With results_path the measurements
+are also written as JSON, with the database version, for the record.
+"""
+
+import json
+import time
+from datetime import date, datetime, timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary import (
+    REPORT_PAGE_LENGTH,
+    add_report_indexes,
+    get_data,
+    get_query,
+)
+
+NAME_PREFIX = "BENCH-PQ-"
+INSERT_CHUNK_SIZE = 10000
+STATUSES = ("Draft", "Submitted to Manufacturing", "Costing Done", "Approved Internally", "Rejected")
+CUSTOMERS = 2000
+OWNERS = 50
+DAYS = 730
+
+
+def execute(pre_quotations=500000, items_per_pre_quotation=20, runs=3, cleanup=True, results_path=None):
+    add_report_indexes()
+
+    today = date.today()
+    cases = {
+        "month": {"from_date": today - timedelta(days=30), "to_date": today},
+        "status + quarter": {"status": "Costing Done", "from_date": today - timedelta(days=90), "to_date": today},
+        "customer": {"customer": f"{NAME_PREFIX}Customer 7"},
+        "owner + month": {"owner": "bench-owner-3@example.com", "from_date": today - timedelta(days=30), "to_date": today},
+    }
+
+    results = {
+        "database": frappe.db.sql("SELECT VERSION()")[0][0],
+        "pre_quotations": pre_quotations,
+        "items_per_pre_quotation": items_per_pre_quotation,
+        "cases": {},
+    }
+
+    try:
+        seed(pre_quotations, items_per_pre_quotation)
+
+        for label, filters in cases.items():
+            filters = frappe._dict(filters)
+            rows, full_ms = time_median(runs, lambda: get_data(filters))
+            _page, page_ms = time_median(runs, lambda: get_data(filters, page_length=REPORT_PAGE_LENGTH))
+            print(f"{label:<20} {len(rows):>8} rows  median {full_ms:9.1f} ms  first page {page_ms:9.1f} ms")
+
+            query, values = get_query(filters, page_length=REPORT_PAGE_LENGTH)
+            plan = frappe.db.sql(f"EXPLAIN {query}", values, as_dict=1)
+            for step in plan:
+                print(f"    {step.get('table')}: key={step.get('key')} rows={step.get('rows')} {step.get('Extra') or ''}")
+
+            results["cases"][label] = {
+                "rows": len(rows),
+                "median_ms": round(full_ms, 1),
+                "first_page_median_ms": round(page_ms, 1),
+                "plan": [
+                    {"key": step.get("key"), "rows": step.get("rows"), "extra": step.get("Extra")}
+                    for step in plan
+                ],
+            }
+
+    finally:
+        if cleanup:
+            remove_seed()
+
+    if results_path:
+        with open(results_path, "w") as f:
+            json.dump(results, f, indent=1, default=str)
+
+    return results
+
+
+def time_median(runs, fn):
+    """Result of fn and its median run time in ms"""
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return result, timings[len(timings) // 2] * 1000
+
+
+def seed(pre_quotations, items_per_pre_quotation):
+    print(f"Seeding {pre_quotations} Pre-Quotations with {items_per_pre_quotation} items each")
+
+    now = now_datetime()
+    today = date.today()
+    parent_fields = [
+        "name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "pre_quotation_date", "customer", "status", "estimated_total_cost", "estimated_selling_price",
+        "items_count", "total_quantity",
+    ]
+    item_fields = [
+        "name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "parent", "parenttype", "parentfield", "idx", "item_name", "quantity",
+    ]
+
+    for chunk_start in range(0, pre_quotations, INSERT_CHUNK_SIZE):
+        parents = []
+        items = []
+        for i in range(chunk_start, min(chunk_start + INSERT_CHUNK_SIZE, pre_quotations)):
+            name = f"{NAME_PREFIX}{i:08d}"
+            owner = f"bench-owner-{i % OWNERS}@example.com"
+            # Created on its document date, so the (creation, name) order is realistic
+            created = datetime.combine(today - timedelta(days=i % DAYS), datetime.min.time()) + timedelta(seconds=i % 86400)
+            parents.append((
+                name, created, now, owner, owner, 0,
+                today - timedelta(days=i % DAYS), f"{NAME_PREFIX}Customer {i % CUSTOMERS}",
+                STATUSES[i % len(STATUSES)], 1000, 1300,
+                items_per_pre_quotation, items_per_pre_quotation,
+            ))
+            items.extend(
+                (
+                    f"{name}-{idx}", now, now, owner, owner, 0,
+                    name, "Pre-Quotation", "custom_furniture_items", idx, f"Item {idx}", 1,
+                )
+                for idx in range(1, items_per_pre_quotation + 1)
+            )
+
+        frappe.db.bulk_insert("Pre-Quotation", parent_fields, parents)
+        frappe.db.bulk_insert("Pre-Quotation Item", item_fields, items)
+        frappe.db.commit()
+
+
+def remove_seed():
+    for doctype, fieldname in (("Pre-Quotation Item", "parent"), ("Pre-Quotation", "name")):
+        while True:
+            frappe.db.sql(
+                f"DELETE FROM `tab{doctype}` WHERE `{fieldname}` LIKE %s LIMIT %s",
+                (f"{NAME_PREFIX}%", INSERT_CHUNK_SIZE * 10),
+            )
+            deleted = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+            frappe.db.commit()
+            if not deleted:
+                break
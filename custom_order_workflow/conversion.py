@@ -0,0 +1,352 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, nowdate
+from frappe.utils.caching import request_cache
+
+# Item Group for items created from Pre-Quotation rows
+CUSTOM_FURNITURE_ITEM_GROUP = "Custom Furniture"
+
+# Default and maximum number of background jobs a bulk conversion is split into
+BULK_CONVERSION_WORKERS = 4
+MAX_BULK_CONVERSION_WORKERS = 8
+
+# Seconds the per-document results of a bulk conversion batch are kept
+BULK_CONVERSION_TTL = 24 * 60 * 60
+
+# Cache hash of per-company conversion defaults
+CONVERSION_DEFAULTS_KEY = "custom_order_workflow:conversion_defaults"
+
+
+@request_cache
+def get_conversion_defaults(company=None):
+    """Default tax template and warehouse used for conversion.
+
+    Cached per company in the site cache until a Sales Taxes and Charges
+    Template, Stock Settings or Company changes, and memoized for the rest
+    of the request or job.
+    """
+
+    return frappe.cache().hget(
+        CONVERSION_DEFAULTS_KEY, company or "", generator=lambda: load_conversion_defaults(company)
+    )
+
+
+def load_conversion_defaults(company):
+    return frappe._dict(
+        default_tax=frappe.db.get_value(
+            "Sales Taxes and Charges Template",
+            {"company": company, "is_default": 1},
+            ["name", "title"],
+            as_dict=True,
+        ),
+        default_warehouse=frappe.db.get_single_value("Stock Settings", "default_warehouse"),
+    )
+
+
+def clear_conversion_defaults(doc=None, method=None):
+    """Drop cached conversion defaults; hooked to their source doctypes"""
+
+    delete_conversion_defaults()
+
+    # Again after commit, so defaults read before the commit are not kept
+    frappe.db.after_commit.add(delete_conversion_defaults)
+
+
+def delete_conversion_defaults():
+    frappe.cache().delete_value(CONVERSION_DEFAULTS_KEY)
+
+
+def normalize_item_code(item_code):
+    """Item codes compare as MariaDB compares names: trimmed and case-insensitive"""
+    return cstr(item_code).strip().casefold()
+
+
+def get_existing_item_codes(item_codes):
+    """Return the normalized codes of the given item codes that exist as Items, in one query"""
+
+    item_codes = list({cstr(item_code).strip() for item_code in item_codes} - {""})
+    if not item_codes:
+        return set()
+
+    return {
+        normalize_item_code(item_code)
+        for item_code in frappe.get_all("Item", filters={"name": ["in", item_codes]}, pluck="name")
+    }
+
+
+def ensure_items(item_rows, ignore_permissions=False):
+    """Create the Items missing from item_rows and return their normalized codes.
+
+    Each row is a dict of Item values keyed by Item fieldnames and must
+    contain `item_code`; child tables (e.g. `item_defaults`) may be given as
+    lists of dicts. Existing Items are resolved in one query; each missing
+    one is inserted once through the Item controller, without committing.
+    Items are created with the user's Item permissions unless
+    ignore_permissions is set by a caller that checked them up front.
+    """
+
+    existing = get_existing_item_codes(row["item_code"] for row in item_rows)
+
+    created = set()
+    for row in item_rows:
+        item_code = normalize_item_code(row["item_code"])
+        if item_code and item_code not in existing and item_code not in created:
+            insert_item(row, ignore_permissions=ignore_permissions)
+            created.add(item_code)
+
+    return created
+
+
+def insert_item(row, ignore_permissions=False):
+    item = frappe.new_doc("Item")
+    item.update({
+        "item_group": CUSTOM_FURNITURE_ITEM_GROUP,
+        "is_stock_item": 1,
+    })
+    item.update(row)
+    item.item_code = item.item_code.strip()
+    item.item_name = item.item_name or item.item_code
+    item.insert(ignore_permissions=ignore_permissions)
+
+
+class ConversionContext:
+    """Lookups shared by every Pre-Quotation converted in one request or batch"""
+
+    def __init__(self, ignore_permissions=False):
+        # Set by the bulk conversion jobs, whose endpoint checks Item create permission
+        self.ignore_permissions = ignore_permissions
+        self.company = frappe.defaults.get_user_default("company")
+
+        defaults = get_conversion_defaults(self.company)
+        self.default_tax = defaults.default_tax
+        self.default_warehouse = defaults.default_warehouse
+
+        # Normalized item codes known to exist, so repeated items are not looked up again
+        self.known_item_codes = set()
+
+    def ensure_items(self, item_rows):
+        item_rows = [
+            row for row in item_rows if normalize_item_code(row["item_code"]) not in self.known_item_codes
+        ]
+        if item_rows:
+            ensure_items(item_rows, ignore_permissions=self.ignore_permissions)
+            self.known_item_codes.update(normalize_item_code(row["item_code"]) for row in item_rows)
+
+
+def get_item_rows(pre_quotation_items):
+    """Item master values for Pre-Quotation Item rows, keyed by Item fieldname"""
+
+    return [
+        {
+            "item_code": item_data.item_name,
+            "item_name": item_data.item_name,
+            "description": item_data.description,
+            "stock_uom": item_data.uom,
+            "valuation_rate": item_data.cost_per_unit or 0,
+            "image": item_data.attached_image,
+        }
+        for item_data in pre_quotation_items
+    ]
+
+
+def make_quotation(pre_quotation, context=None):
+    """Create a Quotation from a Pre-Quotation in the current transaction"""
+
+    if pre_quotation.status != "Converted to Quotation":
+        frappe.throw("Pre-Quotation must be in 'Converted to Quotation' status to create a Quotation.")
+
+    context = context or ConversionContext()
+
+    quotation = frappe.new_doc("Quotation")
+    quotation.transaction_date = nowdate()
+    quotation.valid_until = pre_quotation.valid_until
+
+    # Set quotation_to and party_name based on lead or customer
+    if pre_quotation.customer:
+        quotation.quotation_to = "Customer"
+        quotation.party_name = pre_quotation.customer
+        quotation.customer = pre_quotation.customer
+    elif pre_quotation.lead:
+        quotation.quotation_to = "Lead"
+        quotation.party_name = pre_quotation.lead
+        quotation.lead = pre_quotation.lead
+
+    if context.default_tax:
+        quotation.taxes_and_charges = context.default_tax.name
+
+    # Resolve all item codes in one query and create only the missing Items
+    context.ensure_items(get_item_rows(pre_quotation.custom_furniture_items))
+
+    for item_data in pre_quotation.custom_furniture_items:
+        quotation.append("items", {
+            "item_code": item_data.item_name,
+            "item_name": item_data.item_name,
+            "description": item_data.description,
+            "qty": item_data.quantity,
+            "uom": item_data.uom,
+            "rate": item_data.selling_price_per_unit,
+            "amount": item_data.total_selling_amount,
+            "base_rate": item_data.selling_price_per_unit,
+            "base_amount": item_data.total_selling_amount,
+            "vat_rate": item_data.vat_rate_item
+        })
+
+    quotation.set_onload("pre_quotation_id", pre_quotation.name)
+    quotation.insert()
+
+    # Remember the Quotation so bulk conversion can skip this document
+    pre_quotation.db_set("quotation", quotation.name)
+
+    return quotation.name
+
+
+def get_existing_quotation(pre_quotation, existing_quotations=None):
+    """The Quotation already created from a Pre-Quotation, if it still exists.
+
+    existing_quotations, when given, is the set of linked Quotations known to
+    exist, so a whole selection is checked with one query.
+    """
+
+    if not pre_quotation.quotation:
+        return None
+
+    if existing_quotations is None:
+        exists = frappe.db.exists("Quotation", pre_quotation.quotation)
+    else:
+        exists = pre_quotation.quotation in existing_quotations
+
+    return pre_quotation.quotation if exists else None
+
+
+def get_conversion_skip_reason(pre_quotation, existing_quotations=None):
+    """Why a Pre-Quotation is not converted, or None; shared by the bulk endpoint and its jobs"""
+
+    quotation = get_existing_quotation(pre_quotation, existing_quotations)
+    if quotation:
+        return _("Quotation {0} already exists").format(quotation)
+
+    if pre_quotation.status != "Converted to Quotation":
+        return _("Status is {0}").format(pre_quotation.status)
+
+
+def get_bulk_conversion_key(batch_id):
+    return f"custom_order_workflow:bulk_conversion:{batch_id}"
+
+
+def start_bulk_conversion(names, skipped=None, workers=BULK_CONVERSION_WORKERS):
+    """Queue the conversion of Pre-Quotations and return the batch id"""
+
+    batch_id = frappe.generate_hash(length=12)
+    key = get_bulk_conversion_key(batch_id)
+
+    frappe.cache().hset(key, "__batch__", {
+        "total": len(names) + len(skipped or {}),
+        "user": frappe.session.user,
+    })
+    frappe.cache().expire(frappe.cache().make_key(key), BULK_CONVERSION_TTL)
+    for name, reason in (skipped or {}).items():
+        frappe.cache().hset(key, name, {"status": "Skipped", "message": reason})
+
+    if names:
+        frappe.enqueue(
+            "custom_order_workflow.conversion.prepare_bulk_conversion",
+            queue="long",
+            batch_id=batch_id,
+            names=names,
+            workers=workers,
+        )
+    else:
+        publish_bulk_conversion_summary(batch_id)
+
+    return batch_id
+
+
+def prepare_bulk_conversion(batch_id, names, workers=BULK_CONVERSION_WORKERS):
+    """Create the Items of all documents at once, then fan the conversions out"""
+
+    items = frappe.get_all(
+        "Pre-Quotation Item",
+        filters={"parenttype": "Pre-Quotation", "parent": ["in", names]},
+        fields=["parent", "item_name", "description", "uom", "cost_per_unit", "attached_image"],
+    )
+    ensure_items(get_item_rows(items), ignore_permissions=True)
+    frappe.db.commit()
+
+    item_codes = {}
+    for item in items:
+        item_codes.setdefault(item.parent, set()).add(normalize_item_code(item.item_name))
+
+    workers = max(1, min(cint(workers) or BULK_CONVERSION_WORKERS, MAX_BULK_CONVERSION_WORKERS, len(names)))
+    for i in range(workers):
+        slice_names = names[i::workers]
+        frappe.enqueue(
+            "custom_order_workflow.conversion.convert_pre_quotations",
+            queue="long",
+            batch_id=batch_id,
+            names=slice_names,
+            item_codes=sorted(set().union(*(item_codes.get(name, ()) for name in slice_names))),
+        )
+
+
+def convert_pre_quotations(batch_id, names, item_codes=None):
+    """Background job converting a slice of a bulk conversion batch"""
+
+    key = get_bulk_conversion_key(batch_id)
+    context = ConversionContext(ignore_permissions=True)
+
+    # Items created or found by prepare_bulk_conversion
+    context.known_item_codes.update(item_codes or ())
+
+    for name in names:
+        try:
+            pre_quotation = frappe.get_doc("Pre-Quotation", name)
+            reason = get_conversion_skip_reason(pre_quotation)
+            if reason:
+                result = {"status": "Skipped", "quotation": pre_quotation.quotation, "message": reason}
+            else:
+                quotation = make_quotation(pre_quotation, context)
+                frappe.db.commit()
+                result = {"status": "Converted", "quotation": quotation}
+
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Bulk Quotation Conversion Error: {name}")
+
+            # Items created in the rolled back transaction are gone again
+            context.known_item_codes = set(item_codes or ())
+            result = {"status": "Failed", "message": str(e)}
+
+        frappe.cache().hset(key, name, result)
+
+    publish_bulk_conversion_summary(batch_id)
+
+
+def get_bulk_conversion_summary(batch_id):
+    """Per-document results of a bulk conversion batch"""
+
+    results = frappe.cache().hgetall(get_bulk_conversion_key(batch_id))
+    batch = results.pop("__batch__", None)
+    if not batch:
+        return None
+
+    counts = {}
+    for result in results.values():
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    return {
+        "batch_id": batch_id,
+        "user": batch["user"],
+        "total": batch["total"],
+        "pending": batch["total"] - len(results),
+        "counts": counts,
+        "results": results,
+    }
+
+
+def publish_bulk_conversion_summary(batch_id):
+    summary = get_bulk_conversion_summary(batch_id)
+    if summary and not summary["pending"]:
+        frappe.publish_realtime("bulk_quotation_conversion", summary, user=summary["user"])
@@ -0,0 +1,364 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+from functools import partial
+
+import frappe
+import numpy as np
+from frappe.utils import cint, cstr, flt
+
+from custom_order_workflow.costing.rules import DIMENSIONS, MATCH_ATTRIBUTES
+from custom_order_workflow.costing.specifications import SPECIFICATION_DOCTYPES, normalize
+
+# Pre-Quotations in these states hold costs manufacturing has confirmed
+COSTED_STATUSES = ("Costing Done", "Approved Internally", "Converted to Quotation")
+
+# Cache key holding the generation of the history index; a new generation
+# makes every worker reload it in full
+HISTORY_VERSION_KEY = "custom_order_workflow:costing_history_version"
+
+# Redis list, per generation, of Pre-Quotations costed since it started;
+# workers add the ones they have not seen yet to their index
+HISTORY_LOG_KEY = "custom_order_workflow:costing_history_log"
+
+# Categorical specification attributes compared between rows
+CATEGORY_ATTRIBUTES = MATCH_ATTRIBUTES[1:]
+
+# Distance added per differing category, in the units of the dimensions (cm)
+CATEGORY_PENALTY = 50
+
+# Nearest rows further away than this are not used for a cost suggestion
+MAX_SUGGESTION_DISTANCE = 100
+
+SIMILAR_LIMIT = 5
+
+# site -> (generation, log entries applied, CostingHistoryIndex)
+_history_indexes = {}
+
+
+def get_specification_values(specification):
+    """Normalized categories and dimensions of a specification"""
+    return (
+        tuple(normalize(specification.get(attribute)) for attribute in CATEGORY_ATTRIBUTES),
+        tuple(flt(specification.get(dimension)) for dimension in DIMENSIONS),
+    )
+
+
+def get_fingerprint(item_type, categories, dimensions):
+    """Key shared by rows with identical specifications"""
+    return (normalize(item_type), categories, tuple(round(value, 1) for value in dimensions))
+
+
+class CostingHistoryGroup:
+    """Historical rows of one item type, as arrays for vectorized distance checks.
+
+    Rows are appended to lists; the arrays are rebuilt from them on the first
+    search after a change.
+    """
+
+    def __init__(self):
+        self.codes = {attribute: {} for attribute in CATEGORY_ATTRIBUTES}
+        self.entries = []
+        self.positions = {}
+        self.dimension_rows = []
+        self.category_rows = []
+        self.arrays = None
+
+    def add(self, entry, categories, dimensions):
+        self.positions.setdefault(entry.pre_quotation, []).append(len(self.entries))
+        self.entries.append(entry)
+        self.dimension_rows.append(dimensions)
+        self.category_rows.append(self.get_codes(categories, add=True))
+        self.arrays = None
+
+    def get_codes(self, categories, add=False):
+        # 0 stands for an empty value, -1 for a value no historical row has
+        codes = []
+        for attribute, value in zip(CATEGORY_ATTRIBUTES, categories):
+            if not value:
+                codes.append(0)
+            elif add:
+                codes.append(self.codes[attribute].setdefault(value, len(self.codes[attribute]) + 1))
+            else:
+                codes.append(self.codes[attribute].get(value, -1))
+
+        return codes
+
+    def get_arrays(self):
+        if self.arrays is None:
+            self.arrays = (
+                np.array(self.dimension_rows, dtype=float).reshape(-1, len(DIMENSIONS)),
+                np.array(self.category_rows, dtype=np.int32).reshape(-1, len(CATEGORY_ATTRIBUTES)),
+                np.array([entry.active for entry in self.entries], dtype=bool),
+            )
+
+        return self.arrays
+
+    def nearest(self, categories, dimensions, limit, exclude=None):
+        """(entry, distance) of the closest active rows, closest first, leaving out the rows of Pre-Quotation exclude"""
+
+        if not self.entries:
+            return []
+
+        history_dimensions, history_categories, active = self.get_arrays()
+        query_categories = np.array(self.get_codes(categories), dtype=np.int32)
+
+        # Categories left empty on the new row match anything
+        mismatches = ((history_categories != query_categories) & (query_categories != 0)).sum(axis=1)
+        distances = np.abs(history_dimensions - np.array(dimensions)).sum(axis=1) + mismatches * CATEGORY_PENALTY
+        distances[~active] = np.inf
+        if exclude in self.positions:
+            distances[self.positions[exclude]] = np.inf
+
+        limit = min(limit, len(distances))
+        closest = np.argpartition(distances, limit - 1)[:limit]
+        closest = closest[np.argsort(distances[closest], kind="stable")]
+
+        return [
+            (self.entries[i], float(distances[i]))
+            for i in closest.tolist()
+            if np.isfinite(distances[i])
+        ]
+
+
+class CostingHistoryIndex:
+    """Costed Pre-Quotation Items indexed by their specification.
+
+    Identical specifications are found by fingerprint in one dictionary
+    lookup; similar ones by a vectorized distance over dimensions and
+    differing categories within the item type.
+    """
+
+    def __init__(self, rows=()):
+        self.groups = {}
+        self.fingerprints = {}
+        self.rows = {}
+        self.add(rows)
+
+    def add(self, rows):
+        """Add or replace historical rows, as loaded by load_costing_history"""
+
+        for row in rows:
+            previous = self.rows.get(row.name)
+            if previous:
+                # Re-costed rows keep only their latest cost
+                previous.active = False
+                self.fingerprints[previous.fingerprint].remove(previous)
+                self.groups[previous.item_type].arrays = None
+
+            categories, dimensions = get_specification_values(row)
+            entry = frappe._dict(
+                name=row.name,
+                pre_quotation=row.pre_quotation,
+                item_name=row.item_name,
+                item_type=row.item_type,
+                cost_per_unit=flt(row.cost_per_unit, 2),
+                fingerprint=get_fingerprint(row.item_type, categories, dimensions),
+                active=True,
+            )
+            self.rows[row.name] = entry
+            self.fingerprints.setdefault(entry.fingerprint, []).append(entry)
+
+            group = self.groups.get(row.item_type)
+            if group is None:
+                group = self.groups[row.item_type] = CostingHistoryGroup()
+            group.add(entry, categories, dimensions)
+
+    def find_similar(self, item_type, specification, limit=SIMILAR_LIMIT, exclude=None):
+        """Closest historical rows for an item type and specification, exact matches first.
+
+        Rows of the Pre-Quotation exclude are left out, so a document being
+        costed is not priced from its own earlier costs.
+        """
+
+        if not specification or item_type not in self.groups:
+            return []
+
+        categories, dimensions = get_specification_values(specification)
+        exact = [
+            entry
+            for entry in self.fingerprints.get(get_fingerprint(item_type, categories, dimensions), [])
+            if entry.pre_quotation != exclude
+        ]
+        results = [get_match(entry, 0.0, exact=True) for entry in exact[-limit:][::-1]]
+
+        if len(results) < limit:
+            seen = {entry.name for entry in exact}
+            group = self.groups[item_type]
+            for entry, distance in group.nearest(categories, dimensions, limit + len(seen), exclude=exclude):
+                if entry.name not in seen and len(results) < limit:
+                    results.append(get_match(entry, distance, exact=False))
+
+        return results
+
+    def suggest(self, item_type, specification, exclude=None):
+        """(unit cost, exact) suggested by history, or (None, False)"""
+
+        matches = self.find_similar(item_type, specification, exclude=exclude)
+        exact = [match.cost_per_unit for match in matches if match.exact]
+        if exact:
+            return flt(np.median(exact), 2), True
+
+        # Inverse-distance weighted mean of the near rows
+        near = [match for match in matches if match.distance <= MAX_SUGGESTION_DISTANCE]
+        if not near:
+            return None, False
+
+        # Rows at distance 0 that are not identical, such as ones filling in categories left empty, weigh alone
+        closest = [match for match in near if match.distance == 0]
+        if closest:
+            return flt(np.mean([match.cost_per_unit for match in closest]), 2), False
+
+        weights = [1 / match.distance for match in near]
+        cost = sum(weight * match.cost_per_unit for weight, match in zip(weights, near)) / sum(weights)
+        return flt(cost, 2), False
+
+
+def get_match(entry, distance, exact=False):
+    return frappe._dict(
+        pre_quotation=entry.pre_quotation,
+        item_name=entry.item_name,
+        cost_per_unit=entry.cost_per_unit,
+        distance=flt(distance, 2),
+        exact=exact,
+    )
+
+
+def estimate_unit_cost(item_type, specification, rules, history=None, exclude=None):
+    """Unit cost from an identical historical row, else the Costing Rules, else similar rows.
+
+    History rows of the Pre-Quotation exclude are not used.
+    """
+
+    suggestion, exact = history.suggest(item_type, specification, exclude=exclude) if history else (None, False)
+    if exact:
+        return suggestion
+
+    cost_per_unit = rules.estimate(item_type, specification)
+    return cost_per_unit if cost_per_unit is not None else suggestion
+
+
+def load_costing_history(pre_quotations=None):
+    """Costed Table and Chair rows joined with their specification row"""
+
+    query, values = get_costing_history_query(pre_quotations)
+    return frappe.db.sql(query, values, as_dict=True)
+
+
+def get_costing_history_query(pre_quotations=None):
+    """Query and values of the costed rows.
+
+    Columns are name, pre_quotation, item_name, item_type and cost_per_unit,
+    followed by CATEGORY_ATTRIBUTES and DIMENSIONS.
+    """
+
+    joins = []
+    columns = []
+    for item_type, doctype in SPECIFICATION_DOCTYPES.items():
+        alias = frappe.scrub(item_type)
+        joins.append(f"""
+            LEFT JOIN `tab{doctype}` {alias}
+                ON item.item_type = {frappe.db.escape(item_type)}
+                AND {alias}.parent = item.parent
+                AND {alias}.parenttype = 'Pre-Quotation'
+                AND LOWER(TRIM({alias}.item_name)) = LOWER(TRIM(item.item_name))
+        """)
+
+    for fieldname in (*CATEGORY_ATTRIBUTES, *DIMENSIONS):
+        sources = [
+            f"{frappe.scrub(item_type)}.`{fieldname}`"
+            for item_type, doctype in SPECIFICATION_DOCTYPES.items()
+            if frappe.get_meta(doctype).has_field(fieldname)
+        ]
+        columns.append(f"COALESCE({', '.join(sources)}) as `{fieldname}`" if sources else f"NULL as `{fieldname}`")
+
+    conditions = "AND pq.name IN %(pre_quotations)s" if pre_quotations else ""
+    specified = " OR ".join(f"{frappe.scrub(item_type)}.name IS NOT NULL" for item_type in SPECIFICATION_DOCTYPES)
+
+    query = f"""
+        SELECT
+            item.name, item.parent as pre_quotation, item.item_name, item.item_type, item.cost_per_unit,
+            {", ".join(columns)}
+        FROM `tabPre-Quotation Item` item
+        INNER JOIN `tabPre-Quotation` pq ON pq.name = item.parent
+        {"".join(joins)}
+        WHERE item.parenttype = 'Pre-Quotation'
+            AND pq.status IN %(statuses)s
+            AND pq.docstatus < 2
+            AND item.cost_per_unit > 0
+            AND ({specified})
+            {conditions}
+        ORDER BY pq.modified, item.idx
+    """
+
+    return query, {"statuses": COSTED_STATUSES, "pre_quotations": tuple(pre_quotations or ())}
+
+
+def get_costing_history():
+    """History index of this worker, brought up to date with the costing log"""
+
+    cache = frappe.cache()
+    generation = cache.get_value(HISTORY_VERSION_KEY, generator=lambda: frappe.generate_hash(length=10))
+    log_key = f"{HISTORY_LOG_KEY}:{generation}"
+
+    cached = _history_indexes.get(frappe.local.site)
+    if cached and cached[0] == generation:
+        _generation, applied, index = cached
+        logged = cache.llen(log_key)
+        if logged > applied:
+            names = {cstr(name) for name in cache.lrange(log_key, applied, logged - 1)}
+            index.add(load_costing_history(names))
+    else:
+        # Read the log length first; documents logged during the load are added again, harmlessly
+        logged = cache.llen(log_key)
+        index = CostingHistoryIndex(load_costing_history())
+
+    _history_indexes[frappe.local.site] = (generation, logged, index)
+    return index
+
+
+def log_costed_pre_quotation(doc, method=None):
+    """Queue a Pre-Quotation that reached Costing Done for the history index; hooked to its saves"""
+
+    if doc.status == "Costing Done" and doc.has_value_changed("status"):
+        # Only committed costs are loaded by workers reading the log
+        frappe.db.after_commit.add(partial(append_costing_log, doc.name))
+
+
+def append_costing_log(name):
+    generation = frappe.cache().get_value(HISTORY_VERSION_KEY)
+    if generation:
+        frappe.cache().rpush(f"{HISTORY_LOG_KEY}:{generation}", name)
+
+
+def clear_costing_history_cache():
+    """Start a new generation, so every worker reloads the history in full"""
+
+    generation = frappe.cache().get_value(HISTORY_VERSION_KEY)
+    frappe.cache().delete_value(HISTORY_VERSION_KEY)
+    if generation:
+        frappe.cache().delete_value(f"{HISTORY_LOG_KEY}:{generation}")
+
+
+@frappe.whitelist()
+def get_similar_costs(item_type, specification, limit=SIMILAR_LIMIT, pre_quotation=None):
+    """Closest historical unit costs for an item type and specification, other than pre_quotation's own.
+
+    The history covers the whole site, so the document and item names are
+    only returned for Pre-Quotations the user can read.
+    """
+
+    frappe.has_permission("Pre-Quotation", "read", throw=True)
+
+    specification = frappe.parse_json(specification or "{}")
+    matches = get_costing_history().find_similar(
+        item_type, specification, max(1, min(cint(limit) or SIMILAR_LIMIT, 50)), exclude=pre_quotation
+    )
+
+    names = list({match.pre_quotation for match in matches})
+    readable = set(frappe.get_list("Pre-Quotation", filters={"name": ["in", names]}, pluck="name")) if names else set()
+    for match in matches:
+        if match.pre_quotation not in readable:
+            match.pre_quotation = match.item_name = None
+
+    return matches
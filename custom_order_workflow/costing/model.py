@@ -0,0 +1,317 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import json
+from functools import partial
+
+import frappe
+import numpy as np
+from frappe.utils import flt, now_datetime
+
+from custom_order_workflow.costing.history import (
+    CATEGORY_ATTRIBUTES,
+    get_costing_history_query,
+    get_specification_values,
+)
+from custom_order_workflow.costing.rules import DIMENSIONS
+from custom_order_workflow.costing.specifications import get_item_specification, normalize
+
+# apply_standard_costing strategy predicting costs with the trained estimator
+LEARNED_MODEL_STRATEGY = "Learned Model"
+
+COSTING_STRATEGIES = ("Standard", LEARNED_MODEL_STRATEGY)
+
+# Model artifact, stored as a private File so every host of the site reads the same one
+COST_MODEL_FILE = "cost_estimator.json"
+
+# Cache key holding the File name of the current artifact
+COST_MODEL_KEY = "custom_order_workflow:cost_estimator_file"
+
+# Artifacts kept; the previous one stays readable for workers that have not seen the new one yet
+COST_MODEL_VERSIONS = 2
+
+# Category values seen on fewer rows get no coefficient of their own
+MIN_CATEGORY_ROWS = 20
+
+# Rows turned into a design matrix at a time while training
+TRAINING_CHUNK_SIZE = 100000
+
+# Intercept, the dimensions and the area precede the category columns
+NUMERIC_FEATURES = 2 + len(DIMENSIONS)
+
+# site -> (artifact File name, CostEstimator)
+_estimators = {}
+
+
+def get_design_matrix(dimensions, category_columns, width):
+    """Rows of [1, *dimensions, area in m², one-hot categories]
+
+    category_columns holds, per category attribute, each row's column index
+    or -1 when the value has no column.
+    """
+
+    count = len(dimensions)
+    matrix = np.zeros((count, width))
+    matrix[:, 0] = 1
+    matrix[:, 1:NUMERIC_FEATURES - 1] = dimensions
+    matrix[:, NUMERIC_FEATURES - 1] = dimensions[:, 0] * dimensions[:, 1] / 10000
+
+    rows = np.arange(count)
+    for columns in category_columns:
+        used = columns >= 0
+        matrix[rows[used], columns[used]] = 1
+
+    return matrix
+
+
+class CostEstimator:
+    """Linear models of unit cost over specification features, one per item type.
+
+    Each model holds its category vocabulary and least-squares coefficients;
+    predicting a document is one matrix product per item type.
+    """
+
+    def __init__(self, models, trained_on=None):
+        self.models = models
+        self.trained_on = trained_on
+        self.columns = {}
+
+        for item_type, model in models.items():
+            offset = NUMERIC_FEATURES
+            columns = {}
+            for attribute in CATEGORY_ATTRIBUTES:
+                values = model["categories"].get(attribute, [])
+                columns[attribute] = {value: offset + i for i, value in enumerate(values)}
+                offset += len(values)
+
+            self.columns[item_type] = columns
+            model["coefficients"] = np.asarray(model["coefficients"], dtype=float)
+
+    def predict(self, item_types, specifications):
+        """Unit cost for each (item type, specification), None where the model cannot tell"""
+
+        predictions = [None] * len(item_types)
+        groups = {}
+        for i, (item_type, specification) in enumerate(zip(item_types, specifications)):
+            if specification and item_type in self.models:
+                groups.setdefault(item_type, []).append(i)
+
+        for item_type, indexes in groups.items():
+            model = self.models[item_type]
+            columns = self.columns[item_type]
+
+            values = [get_specification_values(specifications[i]) for i in indexes]
+            dimensions = np.array([dimension_values for _categories, dimension_values in values], dtype=float)
+            category_columns = [
+                np.array([columns[attribute].get(categories[a], -1) for categories, _dimensions in values])
+                for a, attribute in enumerate(CATEGORY_ATTRIBUTES)
+            ]
+
+            costs = get_design_matrix(dimensions, category_columns, len(model["coefficients"])) @ model["coefficients"]
+            for i, cost in zip(indexes, costs.tolist()):
+                if cost > 0:
+                    predictions[i] = flt(cost, 2)
+
+        return predictions
+
+    def predict_items(self, items, specifications):
+        """Unit cost for each Pre-Quotation Item, from the specification rows of its document"""
+        return self.predict(
+            [item.get("item_type") for item in items],
+            [get_item_specification(item, specifications) for item in items],
+        )
+
+    def as_dict(self):
+        return {
+            "trained_on": self.trained_on,
+            "models": {
+                item_type: {**model, "coefficients": model["coefficients"].tolist()}
+                for item_type, model in self.models.items()
+            },
+        }
+
+
+def train_cost_estimator(rows, chunk_size=TRAINING_CHUNK_SIZE):
+    """Fit a CostEstimator on (item_type, cost_per_unit, *CATEGORY_ATTRIBUTES, *DIMENSIONS) rows"""
+
+    models = {}
+    for item_type, data in encode_training_rows(rows, chunk_size).items():
+        models[item_type] = fit_model(*data, chunk_size=chunk_size)
+
+    return CostEstimator(models, trained_on=str(now_datetime()))
+
+
+def encode_training_rows(rows, chunk_size=TRAINING_CHUNK_SIZE):
+    """Per item type: costs, dimensions, integer category codes and the value of each code
+
+    Rows are packed into float arrays a chunk at a time, so a million rows
+    take under 100 MB.
+    """
+
+    encoded = {}
+    dimensions_end = 2 + len(CATEGORY_ATTRIBUTES) + len(DIMENSIONS)
+    for row in rows:
+        item_type = row[0]
+        # A model keyed None could never be matched by predict
+        if not item_type:
+            continue
+
+        data = encoded.get(item_type)
+        if data is None:
+            data = encoded[item_type] = frappe._dict(
+                codes=[{"": 0} for _attribute in CATEGORY_ATTRIBUTES],
+                chunks=[],
+                pending=[],
+            )
+
+        data.pending.append((
+            flt(row[1]),
+            *(flt(value) for value in row[2 + len(CATEGORY_ATTRIBUTES):dimensions_end]),
+            *(codes.setdefault(normalize(value), len(codes)) for codes, value in zip(data.codes, row[2:])),
+        ))
+
+        if len(data.pending) >= chunk_size:
+            data.chunks.append(np.array(data.pending, dtype=float))
+            data.pending = []
+
+    result = {}
+    for item_type, data in encoded.items():
+        if data.pending:
+            data.chunks.append(np.array(data.pending, dtype=float))
+
+        packed = np.concatenate(data.chunks)
+        values = [sorted(codes, key=codes.get) for codes in data.codes]
+        result[item_type] = (
+            packed[:, 0],
+            packed[:, 1:1 + len(DIMENSIONS)],
+            packed[:, 1 + len(DIMENSIONS):].astype(np.int64),
+            values,
+        )
+
+    return result
+
+
+def fit_model(costs, dimensions, codes, values, chunk_size=TRAINING_CHUNK_SIZE):
+    """Least-squares coefficients from normal equations accumulated chunk by chunk"""
+
+    categories = {}
+    lookups = []
+    offset = NUMERIC_FEATURES
+    for a, attribute in enumerate(CATEGORY_ATTRIBUTES):
+        counts = np.bincount(codes[:, a], minlength=len(values[a]))
+        kept = [code for code in range(1, len(values[a])) if counts[code] >= MIN_CATEGORY_ROWS]
+
+        # The most common level is the reference folded into the intercept; with a column
+        # for every level the normal equations are singular when all rows set the attribute
+        if kept:
+            kept.remove(max(kept, key=lambda code: counts[code]))
+
+        lookup = np.full(len(values[a]), -1)
+        lookup[kept] = np.arange(offset, offset + len(kept))
+        lookups.append(lookup)
+
+        if kept:
+            categories[attribute] = [values[a][code] for code in kept]
+        offset += len(kept)
+
+    width = offset
+    xtx = np.zeros((width, width))
+    xty = np.zeros(width)
+    for start in range(0, len(costs), chunk_size):
+        end = start + chunk_size
+        matrix = get_design_matrix(
+            dimensions[start:end], [lookup[codes[start:end, a]] for a, lookup in enumerate(lookups)], width
+        )
+        xtx += matrix.T @ matrix
+        xty += matrix.T @ costs[start:end]
+
+    coefficients = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+
+    squared_error = 0.0
+    for start in range(0, len(costs), chunk_size):
+        end = start + chunk_size
+        matrix = get_design_matrix(
+            dimensions[start:end], [lookup[codes[start:end, a]] for a, lookup in enumerate(lookups)], width
+        )
+        squared_error += float(np.square(matrix @ coefficients - costs[start:end]).sum())
+
+    return {
+        "categories": categories,
+        "coefficients": coefficients,
+        "rows": len(costs),
+        "rmse": flt((squared_error / len(costs)) ** 0.5, 2),
+    }
+
+
+def get_cost_model_files():
+    """Names of the stored artifacts, newest first"""
+    return frappe.get_all(
+        "File",
+        filters={"file_name": COST_MODEL_FILE, "is_private": 1},
+        order_by="creation desc",
+        pluck="name",
+    )
+
+
+def save_cost_estimator(estimator):
+    """Store the artifact as a new private File and drop all but the last versions"""
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": COST_MODEL_FILE,
+        "is_private": 1,
+        "content": json.dumps(estimator.as_dict(), separators=(",", ":")),
+    }).insert(ignore_permissions=True)
+
+    for name in get_cost_model_files()[COST_MODEL_VERSIONS:]:
+        frappe.delete_doc("File", name, ignore_permissions=True)
+
+    # Workers switch to the new artifact once it is committed
+    frappe.db.after_commit.add(partial(frappe.cache().delete_value, COST_MODEL_KEY))
+
+    return file_doc
+
+
+def get_cost_estimator():
+    """Trained estimator of this site, reloaded when a new artifact is stored; None before the first training"""
+
+    name = frappe.cache().get_value(COST_MODEL_KEY, generator=lambda: next(iter(get_cost_model_files()), ""))
+    if not name:
+        return None
+
+    cached = _estimators.get(frappe.local.site)
+    if cached and cached[0] == name:
+        return cached[1]
+
+    artifact = json.loads(frappe.get_doc("File", name).get_content())
+
+    estimator = CostEstimator(artifact["models"], trained_on=artifact.get("trained_on"))
+    _estimators[frappe.local.site] = (name, estimator)
+    return estimator
+
+
+def iter_training_rows():
+    """Costed rows as training tuples, streamed from an unbuffered cursor"""
+
+    query, values = get_costing_history_query()
+    with frappe.db.unbuffered_cursor():
+        for row in frappe.db.sql(query, values, as_iterator=True):
+            # Drop name, pre_quotation and item_name
+            yield row[3:]
+
+
+def enqueue_train_cost_estimator():
+    frappe.enqueue(
+        "custom_order_workflow.costing.model.retrain_cost_estimator",
+        queue="long",
+        job_id="custom_order_workflow:train_cost_estimator",
+        deduplicate=True,
+    )
+
+
+def retrain_cost_estimator():
+    """Fit the estimator on all costed history and replace the artifact"""
+
+    estimator = train_cost_estimator(iter_training_rows())
+    if estimator.models:
+        save_cost_estimator(estimator)
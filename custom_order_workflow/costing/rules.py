@@ -0,0 +1,146 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import flt
+
+from custom_order_workflow.costing.specifications import normalize
+
+# Cache key holding the version of the Costing Rule table; the compiled index
+# is rebuilt whenever it changes
+RULES_VERSION_KEY = "custom_order_workflow:costing_rules_version"
+
+# Categorical attributes a rule can match on; empty values match anything
+MATCH_ATTRIBUTES = (
+    "item_type",
+    "material_top",
+    "finish_top",
+    "material_legs",
+    "chair_model",
+    "upholstery_material",
+    "armrests",
+    "base_type",
+)
+
+# Dimensions a rule can limit with min_<dimension> / max_<dimension>
+DIMENSIONS = ("length", "width", "height")
+
+RULE_FIELDS = [
+    "name",
+    "priority",
+    "base_cost",
+    "cost_per_sqm",
+    *MATCH_ATTRIBUTES,
+    *(f"{bound}_{dimension}" for dimension in DIMENSIONS for bound in ("min", "max")),
+]
+
+# site -> (version, CostingRuleIndex)
+_compiled_rules = {}
+
+
+class CostingRuleIndex:
+    """Costing Rules compiled for lookup.
+
+    Rules are grouped by which attributes they set (their mask) and then by
+    the values of those attributes, so matching a row costs one dictionary
+    lookup per mask in use followed by a dimension check on the few rules in
+    that bucket.
+    """
+
+    def __init__(self, rules):
+        self.buckets = {}
+
+        for rule in rules:
+            rule = frappe._dict(rule)
+            values = tuple(normalize(rule.get(attribute)) for attribute in MATCH_ATTRIBUTES)
+            mask = tuple(bool(value) for value in values)
+            key = tuple(value for value in values if value)
+
+            rule.limits = tuple(
+                (dimension, flt(rule.get(f"min_{dimension}")), flt(rule.get(f"max_{dimension}")))
+                for dimension in DIMENSIONS
+                if rule.get(f"min_{dimension}") or rule.get(f"max_{dimension}")
+            )
+            rule.rank = (rule.priority or 0, sum(mask) + len(rule.limits))
+
+            self.buckets.setdefault(mask, {}).setdefault(key, []).append(rule)
+
+        for keys in self.buckets.values():
+            for bucket in keys.values():
+                bucket.sort(key=lambda rule: (rule.rank, rule.name), reverse=True)
+
+        # Most specific masks first, so ties are won by the more specific rule
+        self.masks = sorted(self.buckets, key=sum, reverse=True)
+
+    def match(self, attributes):
+        """Best rule for a dict of attribute and dimension values, or None"""
+
+        values = tuple(normalize(attributes.get(attribute)) for attribute in MATCH_ATTRIBUTES)
+        best = None
+
+        for mask in self.masks:
+            key = tuple(value for value, used in zip(values, mask) if used)
+            if not all(key):
+                continue
+
+            for rule in self.buckets[mask].get(key, ()):
+                if best and rule.rank <= best.rank:
+                    break
+
+                if self.within_limits(rule, attributes):
+                    best = rule
+                    break
+
+        return best
+
+    def within_limits(self, rule, attributes):
+        for dimension, minimum, maximum in rule.limits:
+            value = flt(attributes.get(dimension))
+            if minimum and value < minimum:
+                return False
+            if maximum and value > maximum:
+                return False
+
+        return True
+
+    def estimate(self, item_type, specification=None):
+        """Standard unit cost for an item type and its specification, or None"""
+
+        attributes = {"item_type": item_type}
+        if specification:
+            for fieldname in MATCH_ATTRIBUTES[1:] + DIMENSIONS:
+                attributes[fieldname] = specification.get(fieldname)
+
+        rule = self.match(attributes)
+        if not rule:
+            return None
+
+        cost = flt(rule.base_cost)
+        if rule.cost_per_sqm:
+            area = flt(attributes.get("length")) * flt(attributes.get("width")) / 10000
+            cost += flt(rule.cost_per_sqm) * area
+
+        return flt(cost, 2)
+
+
+def get_costing_rules():
+    """Compiled index of enabled Costing Rules, rebuilt only after a rule changes"""
+
+    version = frappe.cache().get_value(
+        RULES_VERSION_KEY, generator=lambda: frappe.generate_hash(length=10)
+    )
+
+    cached = _compiled_rules.get(frappe.local.site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    rules = frappe.get_all("Costing Rule", filters={"enabled": 1}, fields=RULE_FIELDS)
+    index = CostingRuleIndex(rules)
+    _compiled_rules[frappe.local.site] = (version, index)
+
+    return index
+
+
+def clear_costing_rules_cache():
+    """Invalidate the compiled rule index on every worker"""
+    frappe.cache().delete_value(RULES_VERSION_KEY)
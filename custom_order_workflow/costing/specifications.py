@@ -0,0 +1,36 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+# Specification child table on Pre-Quotation for each item type
+SPECIFICATION_TABLES = {
+    "Table": "table_specifications",
+    "Chair": "chair_specifications",
+}
+
+SPECIFICATION_DOCTYPES = {
+    "Table": "Table Specification",
+    "Chair": "Chair Specification",
+}
+
+
+def normalize(value):
+    """Normalize an attribute value for matching"""
+    if value is None:
+        return ""
+    return str(value).strip().lower()
+
+
+def get_item_specifications(doc):
+    """Map (item_type, item name) to the specification row of a Pre-Quotation"""
+
+    specifications = {}
+    for item_type, fieldname in SPECIFICATION_TABLES.items():
+        for row in doc.get(fieldname) or []:
+            specifications.setdefault((item_type, normalize(row.item_name)), row)
+
+    return specifications
+
+
+def get_item_specification(item, specifications):
+    """Specification row for a Pre-Quotation Item, if one was entered"""
+    return specifications.get((item.get("item_type"), normalize(item.item_name)))
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Manus AI and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Costing Rule", {
+// 	refresh(frm) {
+
+// 	},
+// });
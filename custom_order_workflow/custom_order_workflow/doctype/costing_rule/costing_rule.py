@@ -0,0 +1,32 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt
+
+from custom_order_workflow.costing.rules import DIMENSIONS, clear_costing_rules_cache
+
+
+class CostingRule(Document):
+	def validate(self):
+		for dimension in DIMENSIONS:
+			minimum = flt(self.get(f"min_{dimension}"))
+			maximum = flt(self.get(f"max_{dimension}"))
+			if minimum and maximum and minimum > maximum:
+				frappe.throw(_("Min {0} cannot be greater than Max {0}").format(dimension))
+
+	def on_update(self):
+		self.clear_rules_cache()
+
+	def on_trash(self):
+		self.clear_rules_cache()
+
+	def after_rename(self, old, new, merge=False):
+		self.clear_rules_cache()
+
+	def clear_rules_cache(self):
+		# Clear again after commit so no worker compiles the old rules under a new version
+		clear_costing_rules_cache()
+		frappe.db.after_commit.add(clear_costing_rules_cache)
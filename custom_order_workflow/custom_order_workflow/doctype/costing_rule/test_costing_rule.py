@@ -0,0 +1,168 @@
+# Copyright (c) 2026, Manus AI and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_order_workflow.costing.history import CATEGORY_ATTRIBUTES, CostingHistoryIndex, estimate_unit_cost
+from custom_order_workflow.costing.model import (
+	COST_MODEL_KEY,
+	COST_MODEL_VERSIONS,
+	CostEstimator,
+	get_cost_estimator,
+	get_cost_model_files,
+	save_cost_estimator,
+	train_cost_estimator,
+)
+from custom_order_workflow.costing.rules import CostingRuleIndex
+
+
+class TestCostingRule(FrappeTestCase):
+	def test_most_specific_matching_rule_wins(self):
+		index = CostingRuleIndex([
+			{"name": "Any Table", "item_type": "Table", "base_cost": 200},
+			{"name": "Oak Table", "item_type": "Table", "material_top": "Oak", "base_cost": 300, "cost_per_sqm": 100},
+			{
+				"name": "Large Oak Table", "item_type": "Table", "material_top": "oak",
+				"min_length": 200, "base_cost": 500,
+			},
+			{"name": "Mesh Chair", "item_type": "Chair", "upholstery_material": "Mesh", "base_cost": 80},
+			{"name": "Promo Chair", "item_type": "Chair", "priority": 10, "base_cost": 50},
+		])
+
+		small_oak = frappe._dict(material_top="OAK ", length=100, width=50)
+		large_oak = frappe._dict(material_top="Oak", length=240, width=100)
+
+		self.assertEqual(index.estimate("Table", small_oak), 350)
+		self.assertEqual(index.estimate("Table", large_oak), 500)
+		self.assertEqual(index.estimate("Table", frappe._dict(material_top="Glass")), 200)
+		self.assertEqual(index.estimate("Table"), 200)
+		self.assertEqual(index.estimate("Chair", frappe._dict(upholstery_material="Mesh")), 50)
+		self.assertIsNone(index.estimate("Other"))
+
+	def test_costing_history_suggests_identical_then_similar_costs(self):
+		def row(name, cost, **specification):
+			return frappe._dict(
+				name=name, pre_quotation="PQ-1", item_name=name, item_type="Table", cost_per_unit=cost, **specification
+			)
+
+		history = CostingHistoryIndex([
+			row("oak-180", 400, material_top="Oak", length=180, width=90, height=75),
+			row("oak-160", 360, material_top="Oak", length=160, width=90, height=75),
+			row("glass-180", 900, material_top="Glass", length=180, width=90, height=75),
+		])
+		rules = CostingRuleIndex([{"name": "Any Table", "item_type": "Table", "base_cost": 200}])
+
+		same = frappe._dict(material_top=" oak", length=180, width=90, height=75)
+		near = frappe._dict(material_top="Oak", length=170, width=90, height=75)
+		far = frappe._dict(material_top="Pine", length=300, width=120, height=75)
+
+		self.assertEqual(history.suggest("Table", same), (400, True))
+		self.assertEqual(history.find_similar("Table", near)[0].distance, 10)
+		self.assertEqual(history.suggest("Table", near), (420, False))
+
+		# Identical history beats the rules, the rules beat merely similar history
+		self.assertEqual(estimate_unit_cost("Table", same, rules, history), 400)
+		self.assertEqual(estimate_unit_cost("Table", near, rules, history), 200)
+		self.assertEqual(estimate_unit_cost("Table", far, CostingRuleIndex([]), history), None)
+
+		history.add([row("oak-180", 420, material_top="Oak", length=180, width=90, height=75)])
+		self.assertEqual(history.suggest("Table", same), (420, True))
+
+	def test_costing_history_skips_own_rows_and_flags_only_identical_matches(self):
+		def row(name, pre_quotation, cost, **specification):
+			return frappe._dict(
+				name=name, pre_quotation=pre_quotation, item_name=name, item_type="Table", cost_per_unit=cost,
+				**specification
+			)
+
+		history = CostingHistoryIndex([
+			row("own-oak", "PQ-SELF", 999, material_top="Oak", length=180, width=90, height=75),
+			row("other-oak", "PQ-1", 400, material_top="Oak", length=180, width=90, height=75),
+			row("glass", "PQ-2", 900, material_top="Glass", length=180, width=90, height=75),
+		])
+		rules = CostingRuleIndex([{"name": "Any Table", "item_type": "Table", "base_cost": 200}])
+		oak = frappe._dict(material_top="Oak", length=180, width=90, height=75)
+
+		self.assertEqual(history.suggest("Table", oak), (699.5, True))
+		self.assertEqual(history.suggest("Table", oak, exclude="PQ-SELF"), (400, True))
+		self.assertNotIn("PQ-SELF", [match.pre_quotation for match in history.find_similar("Table", oak, exclude="PQ-SELF")])
+		self.assertEqual(estimate_unit_cost("Table", oak, rules, history, exclude="PQ-SELF"), 400)
+
+		# Without a top material every row is at distance 0, yet none is identical
+		any_top = frappe._dict(length=180, width=90, height=75)
+		matches = history.find_similar("Table", any_top, exclude="PQ-SELF")
+		self.assertEqual([(match.distance, match.exact) for match in matches], [(0, False), (0, False)])
+		self.assertEqual(estimate_unit_cost("Table", any_top, rules, history, exclude="PQ-SELF"), 200)
+		self.assertEqual(history.suggest("Table", any_top, exclude="PQ-SELF"), (650, False))
+
+	def test_similar_costs_endpoint_hides_unreadable_documents(self):
+		from unittest.mock import patch
+
+		from custom_order_workflow.costing import history as costing_history
+
+		index = CostingHistoryIndex([
+			frappe._dict(
+				name=f"row-{i}", pre_quotation="_Test Missing PQ", item_name=f"Table {i}", item_type="Table",
+				cost_per_unit=100 + i, material_top="Oak", length=180 + i, width=90, height=75,
+			)
+			for i in range(3)
+		])
+		specification = frappe.as_json({"material_top": "Oak", "length": 180, "width": 90, "height": 75})
+
+		with patch.object(costing_history, "get_costing_history", return_value=index):
+			matches = costing_history.get_similar_costs("Table", specification, limit=-3)
+
+		self.assertEqual(len(matches), 1)
+		self.assertEqual(matches[0].cost_per_unit, 100)
+		self.assertEqual((matches[0].pre_quotation, matches[0].item_name), (None, None))
+
+	def test_cost_estimator_learns_costs_from_history(self):
+		rows = []
+		for length in range(100, 300, 10):
+			for material, extra in (("Oak", 100), ("Glass", 300), ("Pine", 0)):
+				cost = 50 + 200 * length * 80 / 10000 + extra
+				specification = {"material_top": material}
+				rows.append((
+					"Table", cost, *(specification.get(attribute) for attribute in CATEGORY_ATTRIBUTES), length, 80, 75
+				))
+
+		# Rows without an item type are not trained on
+		rows.append((None, 500, *(None for _attribute in CATEGORY_ATTRIBUTES), 100, 80, 75))
+
+		estimator = train_cost_estimator(rows, chunk_size=7)
+		self.assertEqual(list(estimator.models), ["Table"])
+		self.assertEqual(estimator.models["Table"]["rmse"], 0)
+
+		# Every row sets material_top, so one of its three levels is the reference
+		self.assertEqual(len(estimator.models["Table"]["categories"]["material_top"]), 2)
+
+		predictions = estimator.predict(
+			["Table", "Table", "Chair", "Table"],
+			[
+				frappe._dict(material_top="oak", length=150, width=80, height=75),
+				frappe._dict(material_top="Teak", length=150, width=80, height=75),
+				frappe._dict(chair_model="A"),
+				None,
+			],
+		)
+		self.assertEqual(predictions[0], 390)
+		self.assertIsNone(predictions[2])
+		self.assertIsNone(predictions[3])
+
+		# The artifact round-trips through JSON
+		reloaded = CostEstimator(frappe.parse_json(frappe.as_json(estimator.as_dict()))["models"])
+		self.assertEqual(reloaded.predict(["Table"], [frappe._dict(material_top="Glass", length=200, width=80, height=75)]), [670])
+
+		# Stored as a private File, keeping the last versions only
+		for _ in range(COST_MODEL_VERSIONS + 1):
+			file_doc = save_cost_estimator(estimator)
+
+		self.assertEqual(get_cost_model_files()[0], file_doc.name)
+		self.assertEqual(len(get_cost_model_files()), COST_MODEL_VERSIONS)
+
+		# Cleared after commit in production; tests roll back instead
+		frappe.cache().delete_value(COST_MODEL_KEY)
+		self.addCleanup(frappe.cache().delete_value, COST_MODEL_KEY)
+		stored = get_cost_estimator()
+		self.assertEqual(stored.predict(["Table"], [frappe._dict(material_top="Glass", length=200, width=80, height=75)]), [670])
@@ -21,6 +21,10 @@ frappe.ui.form.on("Pre-Quotation", {
     },
 	refresh: function(frm) {
 		setup_field_visibility(frm);
+		setup_costing_listener(frm);
+
+		// Rows may have changed on the server (save, reload)
+		frm.pricing_engine = new custom_order_workflow.pricing.PricingEngine(frm);
 	},
 
 	status: function(frm) {
@@ -54,104 +58,49 @@ frappe.ui.form.on("Pre-Quotation", {
 });
 
 frappe.ui.form.on("Pre-Quotation Item", {
-	
 	quantity: function(frm, cdt, cdn) {
-		calculate_item_totals(frm, cdt, cdn);
-		selling_price_per_unit (frm, cdt, cdn) 
-		profit_margin_percent(frm, cdt, cdn) 
-
-
+		update_item_pricing(frm, cdt, cdn);
 	},
+
 	cost_per_unit: function(frm, cdt, cdn) {
-		let row = locals[cdt][cdn];
-		row.total_cost = flt(row.quantity * row.cost_per_unit);
-		calculate_item_totals(frm, cdt, cdn);
+		update_item_pricing(frm, cdt, cdn);
 	},
-		// When selling price is changed
-		selling_price_per_unit: function(frm, cdt, cdn) {
-			let row = locals[cdt][cdn];
-			row.total_cost = flt(row.quantity * row.cost_per_unit);
-
-			if (row.cost_per_unit > 0) {
-				row.profit_margin_percent = flt(((row.selling_price_per_unit - row.cost_per_unit) / row.cost_per_unit) * 100, 2);
-				row.total_selling_amount = flt(row.quantity * row.selling_price_per_unit);
-				row.vat_amount_item = flt(row.total_selling_amount * (row.vat_rate_item / 100), 2);
-				row.profit_amount = flt(row.total_selling_amount - row.total_cost);
-			}
-			frm.refresh_field("custom_furniture_items");
-			calculate_main_form_totals(frm);
-		},
-	
-		// When profit margin is changed
-		profit_margin_percent: function(frm, cdt, cdn) {
-			let row = locals[cdt][cdn];
-			row.total_cost = flt(row.quantity * row.cost_per_unit);
-
-			row.selling_price_per_unit = flt(row.cost_per_unit * (1 + row.profit_margin_percent / 100), 2);
-			row.total_selling_amount = flt(row.quantity * row.selling_price_per_unit);
-			row.vat_amount_item = flt(row.total_selling_amount * (row.vat_rate_item / 100), 2);
-			row.profit_amount = flt(row.total_selling_amount - row.total_cost);
-	
-			frm.refresh_field("custom_furniture_items");
-			calculate_main_form_totals(frm);
-		},
-	vat_rate_item: function(frm, cdt, cdn) {
-		calculate_item_totals(frm, cdt, cdn);
-	}
-});
 
-function calculate_item_totals(frm, cdt, cdn) {
-	let row = frappe.get_doc(cdt, cdn);
-	row.total_cost = flt(row.quantity * row.cost_per_unit);
-
-	// Calculate selling price or profit margin based on which one is entered
-	if (row.selling_price_per_unit && !row.profit_margin_percent) {
-		if (row.cost_per_unit > 0) {
-			row.profit_margin_percent = flt(((row.selling_price_per_unit - row.cost_per_unit) / row.cost_per_unit) * 100, 2);
-		} else {
-			row.profit_margin_percent = 0;
-		}
-	} else if (row.profit_margin_percent && !row.selling_price_per_unit) {
-		row.selling_price_per_unit = flt(row.cost_per_unit * (1 + row.profit_margin_percent / 100), 2);
-	}
+	// When selling price is changed, the margin follows it
+	selling_price_per_unit: function(frm, cdt, cdn) {
+		locals[cdt][cdn].profit_margin_percent = 0;
+		update_item_pricing(frm, cdt, cdn);
+	},
 
-	row.total_selling_amount = flt(row.quantity * row.selling_price_per_unit);
+	// When profit margin is changed, the selling price follows it
+	profit_margin_percent: function(frm, cdt, cdn) {
+		custom_order_workflow.pricing.apply_profit_margin(locals[cdt][cdn]);
+		update_item_pricing(frm, cdt, cdn);
+	},
 
-	// Calculate VAT amount per item
-	row.vat_amount_item = flt(row.total_selling_amount * (row.vat_rate_item / 100), 2);
+	vat_rate_item: function(frm, cdt, cdn) {
+		update_item_pricing(frm, cdt, cdn);
+	},
 
-	row.profit_amount = flt(row.total_selling_amount - row.total_cost);
+	custom_furniture_items_add: function(frm, cdt, cdn) {
+		update_item_pricing(frm, cdt, cdn);
+	},
 
-	frm.refresh_field("custom_furniture_items");
+	custom_furniture_items_remove: function(frm, cdt, cdn) {
+		get_pricing_engine(frm).remove_row(cdn);
+	}
+});
 
-	// Recalculate main form totals
-	calculate_main_form_totals(frm);
+function get_pricing_engine(frm) {
+	if (!frm.pricing_engine || frm.pricing_engine.frm !== frm) {
+		frm.pricing_engine = new custom_order_workflow.pricing.PricingEngine(frm);
+	}
+	return frm.pricing_engine;
 }
 
-function calculate_main_form_totals(frm) {
-	let total_cost = 0;
-	let total_selling_price = 0;
-	let total_vat_amount = 0;
-	let total_profit_amount = 0;
-
-	frm.doc.custom_furniture_items.forEach(function(row) {
-		total_cost += row.total_cost;
-		total_selling_price += row.total_selling_amount;
-		total_vat_amount += row.vat_amount_item;
-		total_profit_amount += row.profit_amount;
-	});
-
-	frm.set_value("estimated_total_cost", total_cost);
-	frm.set_value("estimated_selling_price", total_selling_price);
-	frm.set_value("total_vat_amount", total_vat_amount);
-	frm.set_value("total_profit_amount", total_profit_amount);
-
-	// Calculate overall profit margin
-	if (total_cost > 0) {
-		frm.set_value("overall_profit_margin", flt((total_profit_amount / total_cost) * 100, 2));
-	} else {
-		frm.set_value("overall_profit_margin", 0);
-	}
+function update_item_pricing(frm, cdt, cdn) {
+	// Reprices the edited row only; rows and totals are redrawn once typing pauses
+	get_pricing_engine(frm).update_row(locals[cdt][cdn]);
 }
 
 function set_pricing_summary_visibility(frm, hidden) {
@@ -243,6 +192,8 @@ function setup_field_visibility(frm) {
 				frm.set_df_property("estimated_total_cost", "hidden", 0);
 				frm.set_df_property("estimated_total_cost", "read_only", 1);
 
+				add_estimate_costing_buttons(frm);
+
 				
 
 			
@@ -332,4 +283,50 @@ function setup_field_visibility(frm) {
 	frm.refresh_field("custom_furniture_items");
 }
 
+function add_estimate_costing_buttons(frm) {
+	if (frm.doc.__islocal) {
+		return;
+	}
+
+	frm.add_custom_button(__("Estimate Costing"), function() {
+		if (frm.is_dirty()) {
+			frappe.msgprint(__("Please save the Pre-Quotation before estimating costing."));
+			return;
+		}
+
+		// Runs in a background job; progress and the result arrive over realtime
+		frm.call("auto_estimate_costing", { enqueue: 1 }).then(r => {
+			if (r.message) {
+				frappe.show_alert({ message: r.message.message, indicator: "blue" });
+			}
+		});
+	}, __("Costing"));
+
+	frm.add_custom_button(__("Cancel Estimation"), function() {
+		frm.call("cancel_auto_estimate_costing").then(r => {
+			if (r.message) {
+				frappe.show_alert({ message: r.message.message, indicator: "orange" });
+			}
+		});
+	}, __("Costing"));
+}
+
+function setup_costing_listener(frm) {
+	frappe.realtime.off("pre_quotation_costing");
+	frappe.realtime.on("pre_quotation_costing", function(data) {
+		if (data.docname !== frm.doc.name) {
+			return;
+		}
 
+		frappe.hide_progress();
+		if (data.status === "Completed") {
+			frappe.show_alert({ message: __("Costing estimated successfully"), indicator: "green" });
+			frm.reload_doc();
+		} else {
+			frappe.show_alert({
+				message: __("Costing estimation {0}", [__(data.status)]),
+				indicator: data.status === "Failed" ? "red" : "orange",
+			});
+		}
+	});
+}
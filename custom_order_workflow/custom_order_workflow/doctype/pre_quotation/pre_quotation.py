@@ -3,15 +3,29 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import flt, nowdate
+from frappe.utils import cint, flt, nowdate
 import json
 
+from custom_order_workflow.conversion import get_existing_quotation, make_quotation
+from custom_order_workflow.costing.history import get_costing_history
+from custom_order_workflow.costing.model import COSTING_STRATEGIES, LEARNED_MODEL_STRATEGY, get_cost_estimator
+from custom_order_workflow.costing.rules import get_costing_rules
+from custom_order_workflow.costing.specifications import get_item_specification, get_item_specifications
+from custom_order_workflow.manufacturing import get_worksheet_header, get_worksheet_item
+from custom_order_workflow.party import get_party_details
+from custom_order_workflow.pricing import PricingEngine, evaluate_scenarios, reprice_items
+from custom_order_workflow.validation import validate_pre_quotation
+
+MAX_PRICING_SCENARIOS = 1000
+
+# Rows costed between progress updates and cancellation checks in the background job
+AUTO_ESTIMATE_CHUNK_SIZE = 500
+
 
 class PreQuotation(Document):
     def validate(self):
         self.calculate_totals()
-        self.validate_items()
-        self.validate_customer_or_lead()
+        self.validate_rules()
         self.fetch_contact_details()
     
     def before_save(self):
@@ -21,68 +35,52 @@ class PreQuotation(Document):
     def calculate_totals(self):
         """Calculate all pricing totals from items"""
         
-        total_cost = 0
-        total_selling_price = 0
-        total_profit = 0
-        total_vat = 0
-        
-        for item in self.custom_furniture_items:
-            # Ensure item calculations are up to date
-            if hasattr(item, 'calculate_totals'):
-                item.calculate_totals()
-            
-            quantity = flt(item.quantity, 2)
-            
-            # Sum up cost components
-            total_cost += flt(item.total_cost, 2) * quantity
-            total_selling_price += flt(item.total_selling_amount, 2)
-            total_profit += flt(item.profit_amount, 2)
-            total_vat += (flt(item.total_selling_amount, 2) - (flt(item.selling_price_per_unit, 2) * quantity))
-
+        # Only rows edited since the last call are repriced
+        totals = self.get_pricing_engine().update(self.custom_furniture_items)
         
         # Update totals
-        self.estimated_total_cost = flt(total_cost, 2)
-        self.estimated_selling_price = flt(total_selling_price, 2)
-        self.total_vat_amount = flt(total_vat, 2)
+        self.estimated_total_cost = flt(totals.total_cost, 2)
+        self.estimated_selling_price = flt(totals.total_selling_price, 2)
+        self.total_vat_amount = flt(totals.total_vat, 2)
+        self.total_profit_amount = flt(totals.total_profit, 2)
+        self.total_quantity = flt(totals.total_quantity, 2)
+        self.items_count = totals.items_count
         
         # Calculate overall profit margin
         if self.estimated_total_cost > 0:
             self.overall_profit_margin = flt(
-                (total_profit / self.estimated_total_cost) * 100, 2
+                (totals.total_profit / self.estimated_total_cost) * 100, 2
             )
         else:
             self.overall_profit_margin = 0
     
-    def validate_items(self):
-        """Validate items before saving"""
+    def get_pricing_engine(self):
+        """Pricing state shared by validate, before_save and the bulk actions"""
         
-        if not self.custom_furniture_items:
-            frappe.throw("Please add at least one item")
+        if not getattr(self, "_pricing_engine", None):
+            self._pricing_engine = PricingEngine()
         
-        for item in self.custom_furniture_items:
-            if not item.item_name:
-                frappe.throw("Item name is required for all items")
-            
-            if not item.quantity or item.quantity <= 0:
-                frappe.throw("Quantity must be greater than 0 for all items")
-
-    def validate_customer_or_lead(self):
-        """Ensure either a customer or a lead is selected"""
-        if not self.customer and not self.lead:
-            frappe.throw("Please select either a Customer or a Lead.")
+        return self._pricing_engine
+    
+    def validate_rules(self):
+        """Check all validation rules of the current status and report every violation at once"""
+        validate_pre_quotation(self)
 
     def fetch_contact_details(self):
         """Fetch contact person and email from selected customer or lead"""
+        if not (self.has_value_changed("customer") or self.has_value_changed("lead")):
+            return
+        
         if self.customer:
-            customer = frappe.get_doc("Customer", self.customer)
+            customer = get_party_details("Customer", self.customer)
             self.contact_person = customer.customer_primary_contact
             self.contact_email = customer.email_id
         elif self.lead:
-            lead = frappe.get_doc("Lead", self.lead)
+            lead = get_party_details("Lead", self.lead)
             self.contact_person = lead.mobile_no
             self.contact_email = lead.email_id
 
-    def apply_bulk_costing(self, material_rate=None, labor_rate=None, overhead_rate=None):
+    def apply_bulk_costing(self, material_rate=None, labor_rate=None, overhead_rate=None, cost_per_unit=None):
         """Apply bulk costing to all items"""
         
         for item in self.custom_furniture_items:
@@ -94,10 +92,10 @@ class PreQuotation(Document):
             
             if overhead_rate:
                 item.overhead_cost = flt(overhead_rate, 2)
-            
-            # Recalculate item totals
-            if hasattr(item, 'calculate_totals'):
-                item.calculate_totals()
+        
+        # Reprice all items in one batched pass
+        priced = reprice_items(self.custom_furniture_items, cost_per_unit=cost_per_unit)
+        self.get_pricing_engine().mark_repriced(self.custom_furniture_items, priced)
         
         # Recalculate document totals
         self.calculate_totals()
@@ -105,17 +103,9 @@ class PreQuotation(Document):
     def apply_bulk_profit_margin(self, profit_margin_percent):
         """Apply bulk profit margin to all items"""
         
-        for item in self.custom_furniture_items:
-            item.profit_margin_percent = flt(profit_margin_percent, 2)
-            
-            # Recalculate selling price based on new margin
-            if item.total_cost > 0:
-                profit_multiplier = 1 + (flt(profit_margin_percent) / 100)
-                item.selling_price_per_unit = flt(item.total_cost * profit_multiplier, 2)
-            
-            # Recalculate item totals
-            if hasattr(item, 'calculate_totals'):
-                item.calculate_totals()
+        # Set the margin, derive selling prices and reprice all items in one batched pass
+        priced = reprice_items(self.custom_furniture_items, profit_margin_percent=profit_margin_percent)
+        self.get_pricing_engine().mark_repriced(self.custom_furniture_items, priced)
         
         # Recalculate document totals
         self.calculate_totals()
@@ -149,45 +139,96 @@ class PreQuotation(Document):
     def create_manufacturing_worksheet(self):
         """Create a manufacturing worksheet with all specifications"""
         
-        worksheet = {
-            "pre_quotation": self.name,
-            "customer": self.customer or self.contact_person,
-            "date": self.pre_quotation_date,
-            "total_estimated_cost": flt(self.estimated_total_cost, 2),
-            "items": []
-        }
+        worksheet = get_worksheet_header(self)
+        specifications = get_item_specifications(self)
         
         for item in self.custom_furniture_items:
-            item_data = {
-                "item_name": item.item_name,
-                "description": item.description,
-                "quantity": flt(item.quantity, 2),
-                "uom": item.uom,
-                "specifications": item.specifications,
-                "notes": item.notes,
-                "manufacturing_notes": item.manufacturing_notes,
-                "estimated_costs": {
-                    "total": flt(item.total_cost, 2)
-                }
-            }
-            
-            worksheet["items"].append(item_data)
+            worksheet["items"].append(get_worksheet_item(item, get_item_specification(item, specifications)))
         
         return worksheet
     
     @frappe.whitelist()
-    def auto_estimate_costing(self):
+    def auto_estimate_costing(self, enqueue=False, strategy=None):
         """Auto-estimate costing for all items based on specifications"""
         
-        for item in self.custom_furniture_items:
-            if hasattr(item, 'apply_standard_costing'):
-                item.apply_standard_costing()
+        if strategy and strategy not in COSTING_STRATEGIES:
+            frappe.throw(f"Costing strategy must be one of {', '.join(COSTING_STRATEGIES)}")
         
+        if cint(enqueue):
+            return self.enqueue_auto_estimate_costing(strategy=strategy)
+        
+        self.estimate_item_costs(strategy=strategy)
         self.calculate_totals()
         self.save()
         
         return {"success": True, "message": "Costing estimated successfully"}
     
+    def estimate_item_costs(self, items=None, rules=None, specifications=None, history=None, strategy=None):
+        """Apply standard costing to the given items, all items by default"""
+        
+        # Rules, costing history and specifications are loaded once for all rows
+        if specifications is None:
+            specifications = get_item_specifications(self)
+        
+        if items is None:
+            items = self.custom_furniture_items
+        
+        # The learned model prices all rows in one vectorized call
+        estimates = [None] * len(items)
+        estimator = get_cost_estimator() if strategy == LEARNED_MODEL_STRATEGY else None
+        if estimator:
+            estimates = estimator.predict_items(items, specifications)
+        
+        # Rules and history are only needed for the rows the model left unpriced
+        if any(estimate is None for estimate in estimates):
+            if rules is None:
+                rules = get_costing_rules()
+            
+            if history is None:
+                history = get_costing_history()
+        
+        for item, estimate in zip(items, estimates):
+            if hasattr(item, 'apply_standard_costing'):
+                item.apply_standard_costing(
+                    rules=rules, specifications=specifications, history=history, estimate=estimate
+                )
+    
+    def enqueue_auto_estimate_costing(self, strategy=None):
+        """Run auto_estimate_costing in a background job and return its job id"""
+        
+        self.check_permission("write")
+        
+        if self.is_new():
+            frappe.throw("Please save the Pre-Quotation before estimating costing")
+        
+        frappe.cache().delete_value(get_costing_cancel_key(self.name))
+        
+        job_id = f"pre_quotation_costing::{self.name}"
+        job = frappe.enqueue(
+            "custom_order_workflow.custom_order_workflow.doctype.pre_quotation.pre_quotation.run_auto_estimate_costing",
+            queue="long",
+            job_id=job_id,
+            deduplicate=True,
+            docname=self.name,
+            strategy=strategy,
+        )
+        
+        return {
+            "success": True,
+            "queued": True,
+            "job_id": job.id if job else job_id,
+            "message": "Costing estimation queued" if job else "Costing estimation is already running",
+        }
+    
+    @frappe.whitelist()
+    def cancel_auto_estimate_costing(self):
+        """Ask a queued costing estimation to stop before it saves"""
+        
+        self.check_permission("write")
+        frappe.cache().set_value(get_costing_cancel_key(self.name), 1, expires_in_sec=3600)
+        
+        return {"success": True, "message": "Costing estimation will be cancelled"}
+    
     @frappe.whitelist()
     def generate_quotation_preview(self):
         """Generate a preview of what the quotation would look like"""
@@ -215,6 +256,21 @@ class PreQuotation(Document):
             })
         
         return preview
+    
+    @frappe.whitelist()
+    def evaluate_pricing_scenarios(self, scenarios):
+        """Return document totals for what-if margin/VAT/cost scenarios without saving"""
+        
+        if isinstance(scenarios, str):
+            scenarios = json.loads(scenarios)
+        
+        if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+            frappe.throw("Scenarios must be a list of objects")
+        
+        if len(scenarios) > MAX_PRICING_SCENARIOS:
+            frappe.throw(f"At most {MAX_PRICING_SCENARIOS} scenarios can be evaluated at once")
+        
+        return evaluate_scenarios(self.custom_furniture_items, scenarios)
 
 
 
@@ -222,74 +278,99 @@ class PreQuotation(Document):
 
 
 
-@frappe.whitelist()
-def create_quotation_from_pre_quotation(docname):
-    pre_quotation = frappe.get_doc("Pre-Quotation", docname)
+def on_doctype_update():
+    # Imported here to keep the report module out of document loading
+    from custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary import add_report_indexes
+    
+    add_report_indexes()
+
 
-    if pre_quotation.status != "Converted to Quotation":
-        frappe.throw("Pre-Quotation must be in 'Converted to Quotation' status to create a Quotation.")
+def get_costing_cancel_key(docname):
+    return f"custom_order_workflow:cancel_costing:{docname}"
 
-    quotation = frappe.new_doc("Quotation")
-    quotation.transaction_date = nowdate()
-    quotation.valid_until = pre_quotation.valid_until
 
-    # Set quotation_to and party_name based on lead or customer
-    if pre_quotation.customer:
-        quotation.quotation_to = "Customer"
-        quotation.party_name = pre_quotation.customer
-        quotation.customer = pre_quotation.customer
-    elif pre_quotation.lead:
-        quotation.quotation_to = "Lead"
-        quotation.party_name = pre_quotation.lead
-        quotation.lead = pre_quotation.lead
-        # Set company
-    company = frappe.defaults.get_user_default("company")
+def run_auto_estimate_costing(docname, strategy=None):
+    """Background job behind PreQuotation.auto_estimate_costing(enqueue=True)"""
+    
+    doc = frappe.get_doc("Pre-Quotation", docname)
+    
+    try:
+        estimate_costing_in_chunks(doc, strategy)
     
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(f"Pre-Quotation Costing Error: {docname}")
+        publish_costing_status(doc, "Failed")
+        raise
 
-    # Get default tax template from company
-    default_tax = frappe.db.get_value(
-            "Sales Taxes and Charges Template",
-                    {"company": company, "is_default": 1},
-                                            ["name", "title"],  # Add more fields as needed
-    as_dict=True)
 
-    if default_tax:
-        quotation.taxes_and_charges = default_tax
+def estimate_costing_in_chunks(doc, strategy=None):
+    items = doc.custom_furniture_items
+    
+    # With the learned model, each chunk loads rules and history only if some row needs them
+    rules = history = None
+    if strategy != LEARNED_MODEL_STRATEGY:
+        rules = get_costing_rules()
+        history = get_costing_history()
+    
+    specifications = get_item_specifications(doc)
+    cancel_key = get_costing_cancel_key(doc.name)
+    
+    for start in range(0, len(items), AUTO_ESTIMATE_CHUNK_SIZE):
+        if is_costing_cancelled(doc, cancel_key):
+            return
+        
+        chunk = items[start:start + AUTO_ESTIMATE_CHUNK_SIZE]
+        doc.estimate_item_costs(
+            chunk, rules=rules, specifications=specifications, history=history, strategy=strategy
+        )
+        
+        done = start + len(chunk)
+        frappe.publish_progress(
+            done * 100 / len(items),
+            title="Estimating Costing",
+            doctype=doc.doctype,
+            docname=doc.name,
+            description=f"{done} of {len(items)} items",
+        )
+    
+    doc.calculate_totals()
+    
+    # A cancel sent while the last chunk ran still stops the save
+    if is_costing_cancelled(doc, cancel_key):
+        return
+    
+    # Saved once; the job runner commits after the job returns
+    doc.save()
+    publish_costing_status(doc, "Completed")
 
-    for item_data in pre_quotation.custom_furniture_items:
-        item_code = item_data.item_name
 
-        # Check if item exists, if not, create it
-        if not frappe.db.exists("Item", item_code):
-            new_item = frappe.new_doc("Item")
-            new_item.item_code = item_code
-            new_item.item_name = item_data.item_name
-            new_item.description = item_data.description
-            new_item.item_group = "Custom Furniture"
-            new_item.stock_uom = item_data.uom
-            new_item.is_stock_item = 1
-            new_item.valuation_rate = item_data.cost_per_unit or 0
-            new_item.save(ignore_permissions=True)
-            frappe.db.commit()
+def is_costing_cancelled(doc, cancel_key):
+    if not frappe.cache().get_value(cancel_key):
+        return False
+    
+    frappe.cache().delete_value(cancel_key)
+    publish_costing_status(doc, "Cancelled")
+    return True
+
 
-            if item_data.attached_image:
-                frappe.db.set_value("Item", item_code, "image", item_data.attached_image)
-                frappe.db.commit()
+def publish_costing_status(doc, status):
+    frappe.publish_realtime(
+        "pre_quotation_costing",
+        {"docname": doc.name, "status": status},
+        doctype=doc.doctype,
+        docname=doc.name,
+        after_commit=status == "Completed",
+    )
 
-        quotation.append("items", {
-            "item_code": item_code,
-            "item_name": item_data.item_name,
-            "description": item_data.description,
-            "qty": item_data.quantity,
-            "uom": item_data.uom,
-            "rate": item_data.selling_price_per_unit,
-            "amount": item_data.total_selling_amount,
-            "base_rate": item_data.selling_price_per_unit,
-            "base_amount": item_data.total_selling_amount,
-            "vat_rate": item_data.vat_rate_item
-        })
 
-    quotation.set_onload("pre_quotation_id", pre_quotation.name)
-    quotation.insert()
+@frappe.whitelist()
+def create_quotation_from_pre_quotation(docname):
+    pre_quotation = frappe.get_doc("Pre-Quotation", docname)
+
+    # Converting again opens the Quotation created before instead of a duplicate
+    quotation = get_existing_quotation(pre_quotation)
+    if quotation:
+        return quotation
 
-    return quotation.name
\ No newline at end of file
+    return make_quotation(pre_quotation)
@@ -1,9 +1,371 @@
 # Copyright (c) 2025, Manus AI and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
 
+def make_pre_quotation(rows):
+	return frappe.get_doc({
+		"doctype": "Pre-Quotation",
+		"customer": "_Test Customer",
+		"custom_furniture_items": [
+			{"item_name": f"Item {i}", **row} for i, row in enumerate(rows)
+		],
+	})
+
+
 class TestPreQuotation(FrappeTestCase):
-	pass
+	def test_pricing_engine_reprices_only_changed_rows(self):
+		doc = make_pre_quotation([
+			{"quantity": 2, "cost_per_unit": 100, "profit_margin_percent": 25, "vat_rate_item": 15},
+			{"quantity": 3, "cost_per_unit": 40, "selling_price_per_unit": 55, "vat_rate_item": 15},
+		])
+		doc.calculate_totals()
+		engine = doc.get_pricing_engine()
+
+		self.assertFalse(any(engine.is_dirty(item) for item in doc.custom_furniture_items))
+		self.assertEqual(doc.estimated_total_cost, 320)
+		self.assertEqual(doc.estimated_selling_price, 477.25)
+		self.assertEqual((doc.items_count, doc.total_quantity, doc.total_profit_amount), (2, 5, 95))
+
+		doc.custom_furniture_items[1].quantity = 4
+		self.assertTrue(engine.is_dirty(doc.custom_furniture_items[1]))
+		doc.calculate_totals()
+
+		self.assertEqual(doc.estimated_total_cost, 360)
+		self.assertEqual(doc.estimated_selling_price, 540.5)
+		self.assertEqual((doc.items_count, doc.total_quantity, doc.total_profit_amount), (2, 6, 110))
+
+		doc.custom_furniture_items.pop()
+		doc.calculate_totals()
+		self.assertEqual(doc.estimated_total_cost, 200)
+		self.assertEqual(doc.estimated_selling_price, 287.5)
+		self.assertEqual((doc.items_count, doc.total_quantity, doc.total_profit_amount), (1, 2, 50))
+
+	def test_pricing_engine_totals_match_full_recalculation(self):
+		import random
+
+		from custom_order_workflow.pricing import PricingEngine
+
+		rng = random.Random(7)
+
+		def make_row():
+			return frappe._dict(
+				quantity=rng.choice([1, 2, 3.5, 7]),
+				cost_per_unit=round(rng.uniform(0, 999), 2),
+				profit_margin_percent=rng.choice([0, 12.5, 33.33]),
+				vat_rate_item=rng.choice([0, 5, 15]),
+			)
+
+		items = [make_row() for _ in range(50)]
+		engine = PricingEngine()
+		engine.update(items)
+
+		# Rows are edited, added and removed many times before the totals are compared
+		for _ in range(2000):
+			action = rng.random()
+			if action < 0.5:
+				rng.choice(items).cost_per_unit = round(rng.uniform(0, 999), 2)
+			elif action < 0.75 or len(items) < 10:
+				items.insert(rng.randrange(len(items) + 1), make_row())
+			else:
+				items.pop(rng.randrange(len(items)))
+			engine.update(items)
+
+		self.assertEqual(engine.update(items), PricingEngine().update([frappe._dict(item) for item in items]))
+
+	def test_bulk_repricing_matches_row_by_row_pricing(self):
+		import random
+
+		from custom_order_workflow.pricing import price_item
+
+		rng = random.Random(42)
+		rows = []
+		for _ in range(500):
+			cost = round(rng.uniform(0, 900), 2) if rng.random() > 0.1 else 0
+			rows.append({
+				"quantity": rng.choice([1, 2, 3.5, 10, 0]),
+				"cost_per_unit": cost,
+				"total_cost": rng.choice([cost, 0]),
+				"selling_price_per_unit": rng.choice([0, round(cost * 1.3, 2)]),
+				"profit_margin_percent": rng.choice([0, 12.5, 25]),
+				"vat_rate_item": rng.choice([0, 5, 15]),
+			})
+
+		fields = (
+			"cost_per_unit", "total_cost", "selling_price_per_unit", "profit_margin_percent",
+			"total_selling_amount", "profit_amount",
+		)
+
+		for margin in (0, 0.5, 17.25, 33.333):
+			expected = make_pre_quotation(rows)
+			for item in expected.custom_furniture_items:
+				item.profit_margin_percent = frappe.utils.flt(margin, 2)
+				if item.total_cost > 0:
+					item.selling_price_per_unit = frappe.utils.flt(item.total_cost * (1 + margin / 100), 2)
+				price_item(item)
+
+			actual = make_pre_quotation(rows)
+			actual.apply_bulk_profit_margin(margin)
+
+			for expected_item, actual_item in zip(expected.custom_furniture_items, actual.custom_furniture_items):
+				for fieldname in fields:
+					self.assertEqual(expected_item.get(fieldname), actual_item.get(fieldname), fieldname)
+
+			expected.calculate_totals()
+			self.assertEqual(expected.estimated_selling_price, actual.estimated_selling_price)
+			self.assertEqual(expected.overall_profit_margin, actual.overall_profit_margin)
+
+		expected = make_pre_quotation(rows)
+		for item in expected.custom_furniture_items:
+			item.cost_per_unit = 120.5
+			price_item(item)
+
+		actual = make_pre_quotation(rows)
+		actual.apply_bulk_costing(cost_per_unit=120.5)
+
+		for expected_item, actual_item in zip(expected.custom_furniture_items, actual.custom_furniture_items):
+			for fieldname in fields:
+				self.assertEqual(expected_item.get(fieldname), actual_item.get(fieldname), fieldname)
+
+	def test_pricing_scenarios_do_not_mutate_document(self):
+		doc = make_pre_quotation([
+			{"quantity": 2, "cost_per_unit": 100, "profit_margin_percent": 25, "vat_rate_item": 15},
+			{"quantity": 3, "cost_per_unit": 40, "selling_price_per_unit": 55, "vat_rate_item": 15},
+		])
+		doc.calculate_totals()
+		before = doc.as_dict()
+
+		current, repriced = doc.evaluate_pricing_scenarios([
+			{},
+			{"profit_margin_percent": 50, "vat_rate": 5, "cost_adjustment_percent": 10},
+		])
+
+		self.assertEqual(doc.as_dict(), before)
+		self.assertEqual(current.estimated_selling_price, doc.estimated_selling_price)
+		self.assertEqual(current.overall_profit_margin, doc.overall_profit_margin)
+		self.assertEqual(repriced.estimated_total_cost, 352)
+		self.assertEqual(repriced.estimated_selling_price, 554.4)
+
+	def test_pricing_scenario_margin_skips_rows_without_cost(self):
+		rows = [
+			{"quantity": 2, "cost_per_unit": 100, "vat_rate_item": 0},
+			{"quantity": 1, "cost_per_unit": 0, "selling_price_per_unit": 80, "vat_rate_item": 0},
+		]
+
+		(scenario,) = make_pre_quotation(rows).evaluate_pricing_scenarios([{"profit_margin_percent": 20}])
+
+		doc = make_pre_quotation(rows)
+		doc.apply_bulk_profit_margin(20)
+
+		self.assertEqual(doc.custom_furniture_items[1].selling_price_per_unit, 80)
+		self.assertEqual(scenario.estimated_selling_price, doc.estimated_selling_price)
+		self.assertEqual(scenario.estimated_selling_price, 320)
+
+	def test_create_quotation_endpoint_converts_and_invalidates_caches(self):
+		from custom_order_workflow.api import create_quotation_from_pre_quotation
+		from custom_order_workflow.report_cache import get_data_version
+
+		doc = make_pre_quotation([
+			{"item_name": "Endpoint Test Table", "quantity": 2, "cost_per_unit": 100, "profit_margin_percent": 25},
+		])
+		doc.insert()
+		doc.db_set("docstatus", 1)
+		version = get_data_version()
+
+		quotation = create_quotation_from_pre_quotation(doc.name)
+
+		self.assertEqual(frappe.db.get_value("Quotation", quotation, "party_name"), "_Test Customer")
+		self.assertEqual(frappe.db.get_value("Pre-Quotation", doc.name, "status"), "Converted to Quotation")
+		self.assertGreater(get_data_version(), version)
+		self.assertTrue(frappe.db.exists(
+			"Pre-Quotation Transition", {"pre_quotation": doc.name, "to_state": "Converted to Quotation"}
+		))
+
+	def test_versioned_payload_tokens(self):
+		from werkzeug.datastructures import Headers
+		from werkzeug.test import EnvironBuilder
+
+		from custom_order_workflow.api import get_pricing_summary
+
+		doc = make_pre_quotation([{"quantity": 2, "cost_per_unit": 100, "profit_margin_percent": 25}])
+		doc.insert()
+
+		first = get_pricing_summary(doc.name)
+		self.assertFalse(first["not_modified"])
+		self.assertIn("data", first)
+		self.assertEqual(get_pricing_summary(doc.name)["version"], first["version"])
+
+		version = first["version"]
+		etag = f'"{version}"'
+		self.assertEqual(get_pricing_summary(doc.name, version), {"version": version, "not_modified": True})
+
+		frappe.local.request = EnvironBuilder(headers={"If-None-Match": etag}).get_request()
+		frappe.local.response_headers = Headers()
+		try:
+			self.assertTrue(get_pricing_summary(doc.name)["not_modified"])
+			self.assertEqual(frappe.local.response_headers.get("ETag"), etag)
+		finally:
+			del frappe.local.request
+			del frappe.local.response_headers
+
+		doc.reload()
+		doc.custom_furniture_items[0].quantity = 3
+		doc.save()
+		changed = get_pricing_summary(doc.name, version)
+		self.assertNotEqual(changed["version"], version)
+		self.assertFalse(changed["not_modified"])
+
+		frappe.set_user("Guest")
+		self.addCleanup(frappe.set_user, "Administrator")
+		with self.assertRaises(frappe.PermissionError):
+			get_pricing_summary(doc.name)
+
+	def test_validation_reports_all_violations(self):
+		from custom_order_workflow.validation import get_violations
+
+		doc = make_pre_quotation([
+			{"item_type": "Table", "quantity": 0, "description": "Oak table"},
+			{"item_type": "Chair", "quantity": 2},
+		])
+		doc.custom_furniture_items[1].item_name = ""
+		doc.status = "Submitted to Manufacturing"
+
+		violations = get_violations(doc)
+		self.assertEqual(len(violations), 5)
+		self.assertIn("Row 1: Quantity must be greater than 0 for item: Item 0", violations)
+		self.assertIn("Row 2: Item name is required", violations)
+
+		doc.status = "Draft"
+		self.assertEqual(len(get_violations(doc)), 2)
+
+	def test_pricing_matches_golden_cases(self):
+		# The same cases are checked against public/js/pricing.js by tests/test_pricing.js
+		import json
+
+		from custom_order_workflow.pricing import price_item
+
+		with open(frappe.get_app_path("custom_order_workflow", "tests", "pricing_golden_cases.json")) as f:
+			cases = json.load(f)
+
+		doc = make_pre_quotation([case["input"] for case in cases["rows"]])
+		for item, case in zip(doc.custom_furniture_items, cases["rows"]):
+			price_item(item)
+			for fieldname, expected in case["expected"].items():
+				self.assertEqual(item.get(fieldname) or 0, expected, fieldname)
+
+		doc.calculate_totals()
+		for fieldname, expected in cases["document"].items():
+			self.assertEqual(doc.get(fieldname), expected, fieldname)
+
+	def test_manufacturing_worksheet_includes_specifications(self):
+		doc = make_pre_quotation([
+			{"item_type": "Table", "quantity": 2, "cost_per_unit": 100, "sales_notes": "Deliver Monday"},
+			{"item_type": "Chair", "quantity": 6, "cost_per_unit": 40},
+		])
+		doc.append("table_specifications", {"item_name": "item 0 ", "length": 180, "material_top": "Oak"})
+		doc.calculate_totals()
+
+		worksheet = doc.create_manufacturing_worksheet()
+		table, chair = worksheet["items"]
+
+		self.assertEqual(worksheet["total_estimated_cost"], 440)
+		self.assertEqual(table["specifications"]["length"], 180)
+		self.assertEqual(table["specifications"]["material_top"], "Oak")
+		self.assertEqual(table["sales_notes"], "Deliver Monday")
+		self.assertEqual(chair["specifications"], {})
+
+	def test_streamed_worksheets_group_rows_by_pre_quotation(self):
+		from custom_order_workflow.manufacturing import MANUFACTURING_STATUS, iter_worksheets
+
+		expected = {}
+		for length in (120, 240):
+			doc = make_pre_quotation([
+				{"item_type": "Table", "quantity": 1, "cost_per_unit": length},
+				{"item_type": "Chair", "quantity": 4, "cost_per_unit": 30},
+			])
+			doc.append("table_specifications", {"item_name": "ITEM 0", "length": length})
+			doc.append("chair_specifications", {"item_name": "Item 1", "chair_model": f"Model {length}"})
+			doc.insert()
+			doc.db_set("status", MANUFACTURING_STATUS)
+			expected[doc.name] = length
+
+		worksheets = {
+			worksheet["pre_quotation"]: worksheet
+			for worksheet in iter_worksheets()
+			if worksheet["pre_quotation"] in expected
+		}
+
+		self.assertEqual(set(worksheets), set(expected))
+		for name, length in expected.items():
+			table, chair = worksheets[name]["items"]
+			self.assertEqual((table["item_type"], table["specifications"]["length"]), ("Table", length))
+			self.assertEqual(table["estimated_costs"]["total"], length)
+			self.assertEqual(chair["specifications"]["chair_model"], f"Model {length}")
+			self.assertEqual(worksheets[name]["total_estimated_cost"], length + 120)
+
+	def test_manufacturing_pack_holds_only_readable_pre_quotations(self):
+		from frappe.permissions import add_user_permission
+
+		from custom_order_workflow.exports import get_export_path
+		from custom_order_workflow.manufacturing import MANUFACTURING_STATUS, build_manufacturing_pack
+
+		names = {}
+		for customer in ("_Test Customer", "_Test Customer 1"):
+			doc = make_pre_quotation([{"item_type": "Table", "quantity": 1, "cost_per_unit": 100}])
+			doc.customer = customer
+			doc.insert()
+			doc.db_set("status", MANUFACTURING_STATUS)
+			names[customer] = doc.name
+
+		user = "test-manufacturing-pack@example.com"
+		if not frappe.db.exists("User", user):
+			frappe.get_doc({
+				"doctype": "User",
+				"email": user,
+				"first_name": "Manufacturing Pack",
+				"send_welcome_email": 0,
+				"roles": [{"role": "Manufacturing User"}],
+			}).insert(ignore_permissions=True)
+		add_user_permission("Customer", "_Test Customer", user, ignore_permissions=True)
+
+		frappe.set_user(user)
+		self.addCleanup(frappe.set_user, "Administrator")
+		file_doc = build_manufacturing_pack("JSON Lines")
+
+		with open(get_export_path(file_doc.file_name)) as f:
+			exported = {frappe.parse_json(line)["pre_quotation"] for line in f}
+
+		self.assertIn(names["_Test Customer"], exported)
+		self.assertNotIn(names["_Test Customer 1"], exported)
+
+		# The scheduled pack for the configured role covers every document
+		frappe.set_user("Administrator")
+		file_doc = build_manufacturing_pack("JSON Lines", ignore_permissions=True)
+		with open(get_export_path(file_doc.file_name)) as f:
+			exported = {frappe.parse_json(line)["pre_quotation"] for line in f}
+
+		self.assertTrue(set(names.values()) <= exported)
+
+	def test_build_worksheet_matches_specifications_streamed_before_items(self):
+		from custom_order_workflow.manufacturing import build_worksheet
+
+		header = {
+			"name": "PQ-1", "customer": "_Test Customer", "contact_person": None,
+			"pre_quotation_date": "2026-10-18", "estimated_total_cost": 300,
+		}
+		rows = [
+			frappe._dict(header, is_item=0, item_type="Table", item_name="Oak Table ", length=200),
+			frappe._dict(header, is_item=0, item_type="Table", item_name="oak table", length=999),
+			frappe._dict(header, is_item=1, item_type="Table", item_name="OAK TABLE", quantity=1, total_cost=300),
+			frappe._dict(header, is_item=1, item_type="Chair", item_name="Oak Table", quantity=2, total_cost=0),
+		]
+
+		worksheet = build_worksheet(iter(rows))
+		table, chair = worksheet["items"]
+
+		self.assertEqual((worksheet["pre_quotation"], worksheet["total_estimated_cost"]), ("PQ-1", 300))
+		# The first specification row of a name wins, as in create_manufacturing_worksheet
+		self.assertEqual(table["specifications"]["length"], 200)
+		self.assertEqual(chair["specifications"], {})
@@ -0,0 +1,47 @@
+# Copyright (c) 2026, Manus AI and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_order_workflow.rollup import apply_rollup_delta, get_rollup_entry, get_rollup_name
+
+
+class TestPreQuotationDailyRollup(FrappeTestCase):
+	def test_status_change_moves_document_between_buckets(self):
+		old = frappe._dict(
+			docstatus=0,
+			pre_quotation_date="2026-01-05",
+			status="Draft",
+			owner="Administrator",
+			customer="_Test Customer",
+			estimated_total_cost=100,
+			estimated_selling_price=130,
+			total_profit_amount=30,
+		)
+		new = frappe._dict(old, status="Costing Done")
+
+		apply_rollup_delta(None, get_rollup_entry(old))
+		apply_rollup_delta(get_rollup_entry(old), get_rollup_entry(new))
+
+		draft, costed = (
+			frappe.db.get_value(
+				"Pre-Quotation Daily Rollup",
+				get_rollup_name(get_rollup_entry(doc)[0]),
+				["pre_quotation_count", "estimated_selling_price"],
+			)
+			for doc in (old, new)
+		)
+		self.assertEqual((draft[0], draft[1]), (0, 0))
+		self.assertEqual((costed[0], costed[1]), (1, 130))
+
+	def test_rollup_name_matches_rebuild_hash(self):
+		bucket = (frappe.utils.getdate("2026-01-05"), "Draft", "Administrator", "ACME Furniture ")
+
+		self.assertEqual(get_rollup_name(bucket), get_rollup_name((bucket[0], "draft", "administrator", "Acme Furniture")))
+		self.assertEqual(
+			get_rollup_name(bucket),
+			frappe.db.sql(
+				"SELECT MD5(LOWER(CONCAT_WS('|', %s, RTRIM(%s), RTRIM(%s), RTRIM(%s))))", bucket
+			)[0][0],
+		)
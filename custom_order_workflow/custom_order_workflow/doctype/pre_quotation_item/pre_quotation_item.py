@@ -5,6 +5,12 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import flt
 
+from custom_order_workflow.costing.history import estimate_unit_cost, get_costing_history
+from custom_order_workflow.costing.model import LEARNED_MODEL_STRATEGY, get_cost_estimator
+from custom_order_workflow.costing.rules import get_costing_rules
+from custom_order_workflow.costing.specifications import get_item_specification, get_item_specifications
+from custom_order_workflow.pricing import price_item
+
 
 class PreQuotationItem(Document):
     def validate(self):
@@ -13,37 +19,12 @@ class PreQuotationItem(Document):
     def calculate_totals(self):
         """Calculate total cost, selling amount, and profit"""
         
-        # Total cost per unit is now directly entered or estimated
-        self.total_cost = flt(self.cost_per_unit, 2)
-        
-        # Calculate selling price based on profit margin if not manually set
-        if self.profit_margin_percent and not self.selling_price_per_unit:
-            profit_multiplier = 1 + (flt(self.profit_margin_percent) / 100)
-            self.selling_price_per_unit = flt(self.total_cost * profit_multiplier, 2)
-        
-        # Calculate profit margin if selling price is set but margin is not
-        elif self.selling_price_per_unit and not self.profit_margin_percent and self.total_cost > 0:
-            profit_amount_per_unit = flt(self.selling_price_per_unit) - flt(self.total_cost)
-            self.profit_margin_percent = flt((profit_amount_per_unit / self.total_cost) * 100, 2)
+        price_item(self)
         
-        # Calculate total selling amount
-        quantity = flt(self.quantity, 2)
-        selling_price_per_unit = flt(self.selling_price_per_unit, 2)
-        total_cost = flt(self.total_cost, 2)
-        vat_rate_item = flt(self.vat_rate_item, 2)
-        
-        # Calculate total selling amount before item VAT
-        selling_amount_before_vat_item = selling_price_per_unit * quantity
-
-        # Calculate item VAT amount
-        item_vat_amount = selling_amount_before_vat_item * (vat_rate_item / 100)
-        
-        # Total selling amount including item VAT
-        self.total_selling_amount = selling_amount_before_vat_item + item_vat_amount
-        
-        # Calculate profit amount
-        self.profit_amount = self.total_selling_amount - (total_cost * quantity) - item_vat_amount
-
+        # Keep the parent's running totals in step with this row
+        parent = getattr(self, "parent_doc", None)
+        if parent and hasattr(parent, "get_pricing_engine"):
+            parent.get_pricing_engine().mark_clean(self)
     
     def before_save(self):
         """Ensure calculations are up to date before saving"""
@@ -63,24 +44,40 @@ class PreQuotationItem(Document):
             "vat_rate_item": flt(self.vat_rate_item, 2)
         }
     
-    def apply_standard_costing(self, item_group=None):
+    def apply_standard_costing(
+        self, item_group=None, rules=None, specifications=None, history=None, strategy=None, estimate=None
+    ):
         """Apply standard costing based on item specifications"""
         
         try:
-            # For now, a simple placeholder for standard costing
-            # In a real scenario, this would involve more complex logic
-            # based on item_group, specs, etc.
-            self.cost_per_unit = 100.00 # Example base cost
+            # Callers costing many rows pass the compiled rules, history and specifications in
+            if specifications is None:
+                parent = getattr(self, "parent_doc", None)
+                specifications = get_item_specifications(parent) if parent else {}
+            
+            specification = get_item_specification(self, specifications)
+            
+            # Document-wide callers predict all rows in one call and pass the estimate in
+            if estimate is None and strategy == LEARNED_MODEL_STRATEGY:
+                estimator = get_cost_estimator()
+                estimate = estimator.predict([self.item_type], [specification])[0] if estimator else None
+            
+            # Rows the learned model cannot price get the standard estimate; only they need rules and history
+            if estimate is not None:
+                cost_per_unit = estimate
+            else:
+                if rules is None:
+                    rules = get_costing_rules()
+                
+                if history is None:
+                    history = get_costing_history()
+                
+                cost_per_unit = estimate_unit_cost(self.item_type, specification, rules, history, exclude=self.parent)
+            if cost_per_unit is not None:
+                self.cost_per_unit = cost_per_unit
             
             # Recalculate totals
             self.calculate_totals()
             
         except Exception as e:
             frappe.log_error(f"Error applying standard costing: {str(e)}")
-
-
-
-
-
-
-
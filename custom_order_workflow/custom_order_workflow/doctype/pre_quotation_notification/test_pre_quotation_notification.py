@@ -0,0 +1,74 @@
+# Copyright (c) 2026, Manus AI and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from custom_order_workflow.server_scripts import notification_outbox
+from custom_order_workflow.server_scripts.notification_outbox import (
+	MAX_NOTIFICATION_ATTEMPTS,
+	get_retry_delay,
+	purge_notification_outbox,
+	send_notifications,
+)
+
+
+def make_intent(**values):
+	return frappe.get_doc({
+		"doctype": "Pre-Quotation Notification",
+		"pre_quotation": "_Test Pre-Quotation",
+		"workflow_state": "Costing Done",
+		"status": "Pending",
+		**values,
+	}).insert(ignore_permissions=True, ignore_links=True)
+
+
+def get_intents(*names):
+	return frappe.get_all(
+		"Pre-Quotation Notification",
+		filters={"name": ["in", names]},
+		fields=["name", "pre_quotation", "workflow_state", "attempts"],
+	)
+
+
+class TestPreQuotationNotification(FrappeTestCase):
+	def test_failed_sends_are_retried_with_backoff(self):
+		intent = make_intent()
+		docs = {"_Test Pre-Quotation": frappe._dict(name="_Test Pre-Quotation")}
+
+		with patch.object(notification_outbox, "get_notification_docs", return_value=docs), patch(
+			"custom_order_workflow.server_scripts.pre_quotation_hooks.send_status_notification",
+			side_effect=Exception("SMTP down"),
+		):
+			send_notifications(get_intents(intent.name))
+			intent.reload()
+
+			self.assertEqual((intent.status, intent.attempts, intent.error), ("Pending", 1, "SMTP down"))
+			self.assertGreater(get_datetime(intent.next_attempt_on), now_datetime())
+
+			for _ in range(MAX_NOTIFICATION_ATTEMPTS - 1):
+				send_notifications(get_intents(intent.name))
+
+			intent.reload()
+			self.assertEqual((intent.status, intent.attempts), ("Failed", MAX_NOTIFICATION_ATTEMPTS))
+
+		self.assertEqual([get_retry_delay(attempts) for attempts in (1, 2, 3)], [5, 10, 20])
+
+	def test_purge_keeps_recent_and_pending_intents(self):
+		old_sent = make_intent(status="Sent")
+		old_pending = make_intent()
+		recent_sent = make_intent(status="Sent")
+
+		for name in (old_sent.name, old_pending.name):
+			frappe.db.set_value(
+				"Pre-Quotation Notification", name, "creation", add_days(now_datetime(), -60), update_modified=False
+			)
+
+		purge_notification_outbox()
+
+		self.assertFalse(frappe.db.exists("Pre-Quotation Notification", old_sent.name))
+		self.assertTrue(frappe.db.exists("Pre-Quotation Notification", old_pending.name))
+		self.assertTrue(frappe.db.exists("Pre-Quotation Notification", recent_sent.name))
@@ -0,0 +1,23 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from custom_order_workflow.server_scripts.notification_outbox import DIGEST_STATE_ROLES
+
+
+class PreQuotationNotificationSettings(Document):
+	def validate(self):
+		roles = set()
+		for row in self.digest_roles:
+			if row.role not in DIGEST_STATE_ROLES.values():
+				frappe.throw(
+					f"Row {row.idx}: digest mode is only available for "
+					+ ", ".join(DIGEST_STATE_ROLES.values())
+				)
+
+			if row.role in roles:
+				frappe.throw(f"Row {row.idx}: role {row.role} is listed more than once")
+
+			roles.add(row.role)
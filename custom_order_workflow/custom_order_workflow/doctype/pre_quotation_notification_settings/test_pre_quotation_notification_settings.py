@@ -0,0 +1,21 @@
+# Copyright (c) 2026, Manus AI and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_order_workflow.server_scripts.notification_outbox import get_intent_status
+
+
+class TestPreQuotationNotificationSettings(FrappeTestCase):
+	def test_digest_roles_hold_back_their_notifications(self):
+		settings = frappe.get_doc("Pre-Quotation Notification Settings")
+		settings.set("digest_roles", [{"role": "Manufacturing User", "interval": "Daily"}])
+		settings.save()
+
+		self.assertEqual(get_intent_status("Submitted to Manufacturing"), "Digest")
+		self.assertEqual(get_intent_status("Costing Done"), "Pending")
+		self.assertEqual(get_intent_status("Rejected"), "Pending")
+
+		settings.append("digest_roles", {"role": "Manufacturing User", "interval": "Hourly"})
+		self.assertRaises(frappe.ValidationError, settings.save)
@@ -0,0 +1,16 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class PreQuotationTransition(Document):
+	pass
+
+
+def on_doctype_update():
+	# Previous transition of a document, and per-state time ranges for the analytics report
+	frappe.db.add_index("Pre-Quotation Transition", ["pre_quotation", "transition_date"])
+	frappe.db.add_index("Pre-Quotation Transition", ["from_state", "transition_date"])
+	frappe.db.add_index("Pre-Quotation Transition", ["to_state", "transition_date"])
@@ -0,0 +1,81 @@
+# Copyright (c) 2026, Manus AI and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime, now_datetime
+
+from custom_order_workflow.report.pre_quotation_workflow_analytics.pre_quotation_workflow_analytics import (
+	get_data,
+)
+from custom_order_workflow.transitions import TRANSITION_DOCTYPE, log_transition
+
+DAY = 24 * 60 * 60
+
+
+def make_pre_quotation(name, status="Draft"):
+	# Inserted without the controller, so no workflow hooks log transitions of their own
+	if not frappe.db.exists("Pre-Quotation", name):
+		frappe.get_doc({
+			"doctype": "Pre-Quotation",
+			"name": name,
+			"naming_series": "PRE-QTN-.YYYY.-",
+			"pre_quotation_date": "2001-01-01",
+			"status": status,
+		}).db_insert()
+
+	return frappe.get_doc("Pre-Quotation", name)
+
+
+def make_transition(pre_quotation, from_state, to_state, date, time_in_from_state=0):
+	frappe.get_doc({
+		"doctype": TRANSITION_DOCTYPE,
+		"pre_quotation": make_pre_quotation(pre_quotation).name,
+		"from_state": from_state,
+		"to_state": to_state,
+		"transition_date": get_datetime(date),
+		"time_in_from_state": time_in_from_state,
+	}).insert(ignore_permissions=True)
+
+
+class TestPreQuotationTransition(FrappeTestCase):
+	def test_log_transition_times_stay_since_previous_transition(self):
+		doc = make_pre_quotation("_Test PQ Transition Log")
+		make_transition(doc.name, None, "Draft", add_to_date(now_datetime(), hours=-2))
+
+		doc.status = "Submitted to Manufacturing"
+		log_transition(doc, "Draft")
+
+		transition = frappe.get_last_doc(TRANSITION_DOCTYPE, filters={"pre_quotation": doc.name, "from_state": "Draft"})
+		self.assertEqual(transition.to_state, "Submitted to Manufacturing")
+		self.assertAlmostEqual(transition.time_in_from_state, 2 * 60 * 60, delta=60)
+
+		first = make_pre_quotation("_Test PQ Transition First")
+		log_transition(first, None)
+		transition = frappe.get_last_doc(TRANSITION_DOCTYPE, filters={"pre_quotation": first.name})
+		self.assertEqual((transition.to_state, transition.time_in_from_state), ("Draft", 0))
+
+	def test_funnel_counts_the_cohort_that_entered_each_state(self):
+		make_transition("_Test PQ Funnel A", None, "Draft", "2001-01-11")
+		make_transition("_Test PQ Funnel A", "Draft", "Submitted to Manufacturing", "2001-01-12", DAY)
+		make_transition("_Test PQ Funnel A", "Submitted to Manufacturing", "Costing Done", "2001-01-13", DAY)
+		make_transition("_Test PQ Funnel B", None, "Draft", "2001-01-11")
+		make_transition("_Test PQ Funnel B", "Draft", "Submitted to Manufacturing", "2001-01-15", 4 * DAY)
+		make_transition("_Test PQ Funnel C", None, "Draft", "2001-01-12")
+
+		# Entered Draft before the period, so it is not part of the Draft cohort
+		make_transition("_Test PQ Funnel D", None, "Draft", "2001-01-01")
+		make_transition("_Test PQ Funnel D", "Draft", "Submitted to Manufacturing", "2001-01-11", 10 * DAY)
+
+		rows = {
+			row.state: row
+			for row in get_data(frappe._dict(from_date="2001-01-10", to_date="2001-01-20"))
+		}
+
+		draft = rows["Draft"]
+		self.assertEqual((draft.entered, draft.moved_to_next, draft.stage_conversion), (3, 2, 66.67))
+		self.assertEqual((draft.exits, draft.median_hours, draft.p90_hours), (3, 96, 211.2))
+
+		submitted = rows["Submitted to Manufacturing"]
+		self.assertEqual((submitted.entered, submitted.moved_to_next), (3, 1))
+		self.assertEqual(submitted.overall_conversion, 100)
@@ -0,0 +1,108 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import csv
+import hashlib
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, now_datetime
+
+
+def get_export_path(file_name):
+    return frappe.get_site_path("private", "files", file_name)
+
+
+def write_csv(path, header, rows):
+    """Write header and rows to a CSV file; returns the number of rows written"""
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+
+    return count
+
+
+def write_xlsx(path, header, rows, sheet_name="Sheet1"):
+    """Write header and rows to an Excel file; returns the number of rows written"""
+
+    from openpyxl import Workbook
+
+    # Write-only workbooks stream rows to disk instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(header)
+
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+
+    workbook.save(path)
+
+    return count
+
+
+def get_file_hash(path):
+    # Hashed in blocks so the export is never read into memory at once
+    content_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            content_hash.update(block)
+
+    return content_hash.hexdigest()
+
+
+def register_private_file(path, attached_to_doctype=None, attached_to_name=None):
+    """File record for an export already written to the site's private files.
+
+    The record is inserted without the File controller: its before_insert
+    reads the whole file back into memory and writes a second copy under a
+    new name, leaving the streamed one orphaned.
+    """
+
+    files_path = os.path.realpath(frappe.get_site_path("private", "files"))
+    path = os.path.realpath(path)
+    if os.path.dirname(path) != files_path or not os.path.isfile(path):
+        frappe.throw(_("Export file {0} was not found in the private files").format(os.path.basename(path)))
+
+    file_name = os.path.basename(path)
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "file_type": os.path.splitext(file_name)[1].lstrip(".").upper(),
+        "is_private": 1,
+        "folder": "Home",
+        "attached_to_doctype": attached_to_doctype,
+        "attached_to_name": attached_to_name,
+        "file_size": os.path.getsize(path),
+        "content_hash": get_file_hash(path),
+    })
+    file_doc.flags.ignore_file_validate = True
+    file_doc.db_insert()
+
+    return file_doc
+
+
+def delete_old_exports(file_name_prefix, days):
+    """Delete exports whose file name starts with file_name_prefix and that are older than days"""
+
+    names = frappe.get_all(
+        "File",
+        filters={
+            "is_private": 1,
+            "file_name": ["like", f"{file_name_prefix}%"],
+            "creation": ["<", add_days(now_datetime(), -days)],
+        },
+        pluck="name",
+    )
+
+    # File.on_trash removes the file from disk as well
+    for name in names:
+        frappe.delete_doc("File", name, ignore_permissions=True)
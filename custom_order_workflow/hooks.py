@@ -254,6 +254,72 @@ fixtures = [
 
 doctype_js = {
     "Lead": "public/js/lead.js",
-    "Customer": "public/js/customer.js"
+    "Customer": "public/js/customer.js",
+    # Shared pricing formulas, bundled with the form script instead of loaded on every desk page
+    "Pre-Quotation": ["public/js/pricing.js"]
 }
 
+doc_events = {
+    "Pre-Quotation": {
+        "on_update": [
+            "custom_order_workflow.server_scripts.pre_quotation_hooks.send_workflow_notifications",
+            "custom_order_workflow.transitions.record_transition",
+            "custom_order_workflow.costing.history.log_costed_pre_quotation",
+            "custom_order_workflow.rollup.update_rollup",
+            "custom_order_workflow.report_cache.bump_data_version"
+        ],
+        "on_update_after_submit": [
+            "custom_order_workflow.transitions.record_transition",
+            "custom_order_workflow.costing.history.log_costed_pre_quotation",
+            "custom_order_workflow.rollup.update_rollup",
+            "custom_order_workflow.report_cache.bump_data_version"
+        ],
+        "on_cancel": [
+            "custom_order_workflow.transitions.record_transition",
+            "custom_order_workflow.rollup.update_rollup",
+            "custom_order_workflow.report_cache.bump_data_version"
+        ],
+        "on_trash": [
+            "custom_order_workflow.rollup.update_rollup",
+            "custom_order_workflow.report_cache.bump_data_version"
+        ]
+    },
+    "Sales Taxes and Charges Template": {
+        "on_update": "custom_order_workflow.conversion.clear_conversion_defaults",
+        "on_trash": "custom_order_workflow.conversion.clear_conversion_defaults"
+    },
+    "Stock Settings": {
+        "on_update": "custom_order_workflow.conversion.clear_conversion_defaults"
+    },
+    "User": {
+        "on_update": "custom_order_workflow.server_scripts.pre_quotation_hooks.clear_role_recipients_cache",
+        "on_trash": "custom_order_workflow.server_scripts.pre_quotation_hooks.clear_role_recipients_cache"
+    },
+    "Has Role": {
+        "on_update": "custom_order_workflow.server_scripts.pre_quotation_hooks.clear_role_recipients_cache",
+        "on_trash": "custom_order_workflow.server_scripts.pre_quotation_hooks.clear_role_recipients_cache"
+    },
+    "Company": {
+        "on_update": "custom_order_workflow.conversion.clear_conversion_defaults",
+        "on_trash": "custom_order_workflow.conversion.clear_conversion_defaults"
+    }
+}
+
+scheduler_events = {
+    "all": [
+        "custom_order_workflow.server_scripts.notification_outbox.enqueue_outbox"
+    ],
+    "hourly": [
+        "custom_order_workflow.server_scripts.notification_digest.send_hourly_digests"
+    ],
+    "daily": [
+        "custom_order_workflow.server_scripts.notification_digest.send_daily_digests",
+        "custom_order_workflow.server_scripts.notification_outbox.purge_notification_outbox",
+        "custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary.purge_exports",
+        "custom_order_workflow.rollup.enqueue_rebuild_rollup",
+        "custom_order_workflow.manufacturing.enqueue_daily_manufacturing_pack",
+        "custom_order_workflow.manufacturing.purge_manufacturing_packs",
+        "custom_order_workflow.costing.history.clear_costing_history_cache",
+        "custom_order_workflow.costing.model.enqueue_train_cost_estimator"
+    ]
+}
@@ -0,0 +1,319 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import os
+from itertools import groupby
+
+import frappe
+from frappe import _
+from frappe.utils import flt, get_url, nowdate
+
+from custom_order_workflow.costing.specifications import (
+    SPECIFICATION_DOCTYPES,
+    get_item_specification,
+    normalize,
+)
+from custom_order_workflow.exports import (
+    delete_old_exports,
+    get_export_path,
+    register_private_file,
+    write_csv,
+    write_xlsx,
+)
+from custom_order_workflow.permissions import get_read_conditions
+from custom_order_workflow.server_scripts.pre_quotation_hooks import get_users_with_role
+
+# Pre-Quotations in this state make up the daily manufacturing pack
+MANUFACTURING_STATUS = "Submitted to Manufacturing"
+
+ITEM_FIELDS = (
+    "item_name",
+    "item_type",
+    "description",
+    "quantity",
+    "uom",
+    "total_cost",
+    "sales_notes",
+    "manufacturing_notes",
+)
+
+# Specification fields copied to the worksheet, per item type
+SPECIFICATION_FIELDS = {
+    "Table": ("length", "width", "height", "material_top", "finish_top", "material_legs", "color", "features"),
+    "Chair": ("chair_model", "upholstery_material", "armrests", "base_type", "color", "features"),
+}
+
+# Flat export columns for the specification fields of all item types
+SPECIFICATION_COLUMNS = tuple(dict.fromkeys(
+    fieldname for fields in SPECIFICATION_FIELDS.values() for fieldname in fields
+))
+
+PACK_FORMATS = {
+    "CSV": "csv",
+    "Excel": "xlsx",
+    "JSON Lines": "jsonl",
+}
+
+DAILY_PACK_FORMAT = "Excel"
+
+PACK_FILE_PREFIX = "manufacturing_pack_"
+
+# Days a pack is kept before the daily purge deletes it
+PACK_RETENTION_DAYS = 30
+
+
+def get_worksheet_header(doc):
+    return {
+        "pre_quotation": doc.name,
+        "customer": doc.customer or doc.contact_person,
+        "date": doc.pre_quotation_date,
+        "total_estimated_cost": flt(doc.estimated_total_cost, 2),
+        "items": [],
+    }
+
+
+def get_worksheet_item(item, specification=None):
+    """Worksheet entry for a Pre-Quotation Item and its specification row"""
+
+    fields = SPECIFICATION_FIELDS.get(item.get("item_type"), ())
+
+    return {
+        "item_name": item.item_name,
+        "item_type": item.item_type,
+        "description": item.description,
+        "quantity": flt(item.quantity, 2),
+        "uom": item.uom,
+        "specifications": {fieldname: specification.get(fieldname) for fieldname in fields} if specification else {},
+        "sales_notes": item.sales_notes,
+        "manufacturing_notes": item.manufacturing_notes,
+        "estimated_costs": {
+            "total": flt(item.total_cost, 2)
+        }
+    }
+
+
+def get_stream_sources():
+    """(doctype, item type, fields) of the child rows streamed for each Pre-Quotation"""
+
+    yield "Pre-Quotation Item", None, ITEM_FIELDS
+    for item_type, doctype in SPECIFICATION_DOCTYPES.items():
+        yield doctype, item_type, ("item_name", *SPECIFICATION_FIELDS[item_type])
+
+
+def get_worksheet_query(ignore_permissions=False):
+    """One query returning every item and specification row, grouped by Pre-Quotation
+
+    Unless ignore_permissions is set, only the Pre-Quotations the user may
+    read are included, by the same rules as the list view.
+    """
+
+    columns = tuple(dict.fromkeys((*ITEM_FIELDS, *SPECIFICATION_COLUMNS)))
+
+    selects = []
+    for doctype, item_type, fields in get_stream_sources():
+        values = [
+            f"`{fieldname}`" if fieldname in fields else f"NULL as `{fieldname}`"
+            for fieldname in columns
+            if fieldname != "item_type"
+        ]
+        # Specification rows sort before items so each item finds its specification
+        selects.append(f"""
+            SELECT
+                parent, {0 if item_type else 1} as is_item, idx,
+                {frappe.db.escape(item_type) if item_type else "item_type"} as item_type,
+                {", ".join(values)}
+            FROM `tab{doctype}`
+            WHERE parenttype = 'Pre-Quotation'
+        """)
+
+    # The match conditions name `tabPre-Quotation` columns, so the table has no alias
+    read_conditions = "" if ignore_permissions else get_read_conditions()
+
+    return f"""
+        SELECT
+            `tabPre-Quotation`.name, `tabPre-Quotation`.customer, `tabPre-Quotation`.contact_person,
+            `tabPre-Quotation`.pre_quotation_date, `tabPre-Quotation`.estimated_total_cost,
+            child.is_item, {", ".join(f"child.`{fieldname}`" for fieldname in columns)}
+        FROM `tabPre-Quotation`
+        INNER JOIN ({" UNION ALL ".join(selects)}) child ON child.parent = `tabPre-Quotation`.name
+        WHERE `tabPre-Quotation`.status = %(status)s AND `tabPre-Quotation`.docstatus < 2
+            {f"AND ({read_conditions})" if read_conditions else ""}
+        ORDER BY `tabPre-Quotation`.name, child.is_item, child.idx
+    """
+
+
+def iter_worksheets(status=MANUFACTURING_STATUS, ignore_permissions=False):
+    """Yield one worksheet per Pre-Quotation in status, streamed from a single query
+
+    Rows are read from an unbuffered cursor, so only one document is held in memory.
+    No other query may run on this connection until the generator is exhausted.
+    """
+
+    # Built first: the permission lookups cannot run on the unbuffered connection
+    query = get_worksheet_query(ignore_permissions)
+
+    with frappe.db.unbuffered_cursor():
+        rows = frappe.db.sql(query, {"status": status}, as_dict=True, as_iterator=True)
+        for _name, doc_rows in groupby(rows, key=lambda row: row.name):
+            yield build_worksheet(doc_rows)
+
+
+def build_worksheet(rows):
+    """Worksheet from the streamed rows of one Pre-Quotation"""
+
+    worksheet = None
+    specifications = {}
+
+    for row in rows:
+        if worksheet is None:
+            worksheet = get_worksheet_header(row)
+
+        if row.is_item:
+            worksheet["items"].append(get_worksheet_item(row, get_item_specification(row, specifications)))
+        else:
+            specifications.setdefault((row.item_type, normalize(row.item_name)), row)
+
+    return worksheet
+
+
+def get_pack_header():
+    return [
+        _("Pre-Quotation"),
+        _("Customer"),
+        _("Date"),
+        _("Item Name"),
+        _("Item Type"),
+        _("Description"),
+        _("Quantity"),
+        _("UOM"),
+        _("Estimated Cost"),
+        _("Sales Notes"),
+        _("Manufacturing Notes"),
+        *(_(frappe.unscrub(fieldname)) for fieldname in SPECIFICATION_COLUMNS),
+    ]
+
+
+def iter_pack_rows(worksheets):
+    """One flat row per worksheet item, matching get_pack_header"""
+
+    for worksheet in worksheets:
+        for item in worksheet["items"]:
+            yield [
+                worksheet["pre_quotation"],
+                worksheet["customer"],
+                worksheet["date"],
+                item["item_name"],
+                item["item_type"],
+                item["description"],
+                item["quantity"],
+                item["uom"],
+                item["estimated_costs"]["total"],
+                item["sales_notes"],
+                item["manufacturing_notes"],
+                *(item["specifications"].get(fieldname) for fieldname in SPECIFICATION_COLUMNS),
+            ]
+
+
+def write_json_lines(path, worksheets):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for worksheet in worksheets:
+            f.write(frappe.as_json(worksheet, indent=None))
+            f.write("\n")
+            count += 1
+
+    return count
+
+
+@frappe.whitelist()
+def export_manufacturing_pack(file_format="CSV"):
+    """Queue a pack of the readable worksheets in Submitted to Manufacturing; the file is announced over realtime
+
+    The job runs as the requesting user, so the pack holds only the Pre-Quotations they may read.
+    """
+
+    frappe.has_permission("Pre-Quotation", "export", throw=True)
+
+    if file_format not in PACK_FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(PACK_FORMATS)))
+
+    frappe.enqueue(
+        "custom_order_workflow.manufacturing.build_manufacturing_pack",
+        queue="long",
+        file_format=file_format,
+        user=frappe.session.user,
+    )
+
+    return {"queued": True}
+
+
+def enqueue_daily_manufacturing_pack():
+    frappe.enqueue(
+        "custom_order_workflow.manufacturing.build_daily_manufacturing_pack",
+        queue="long",
+        job_id="custom_order_workflow:daily_manufacturing_pack",
+        deduplicate=True,
+    )
+
+
+def build_daily_manufacturing_pack():
+    """Build the daily pack and email it to the role set in Pre-Quotation Notification Settings"""
+
+    # The scheduled pack covers every document; it goes to a role, not to one user
+    file_doc = build_manufacturing_pack(DAILY_PACK_FORMAT, skip_empty=True, ignore_permissions=True)
+    if not file_doc:
+        return
+
+    role = frappe.db.get_single_value("Pre-Quotation Notification Settings", "manufacturing_pack_role")
+    recipients = get_users_with_role(role) if role else []
+    if not recipients:
+        return
+
+    frappe.sendmail(
+        recipients=recipients,
+        subject=_("Manufacturing Pack for {0}").format(nowdate()),
+        message=_("The manufacturing pack for {0} is ready: {1}").format(
+            nowdate(), get_url(file_doc.file_url)
+        ),
+        attachments=[{"fid": file_doc.name}],
+    )
+
+
+def build_manufacturing_pack(file_format=DAILY_PACK_FORMAT, user=None, skip_empty=False, ignore_permissions=False):
+    """Stream the worksheets the user may read into a private file and return its File
+
+    With skip_empty, no file is kept when no Pre-Quotation is in Submitted to Manufacturing.
+    """
+
+    file_name = f"{PACK_FILE_PREFIX}{nowdate()}_{frappe.generate_hash(length=6)}.{PACK_FORMATS[file_format]}"
+    path = get_export_path(file_name)
+
+    worksheets = iter_worksheets(ignore_permissions=ignore_permissions)
+    if file_format == "JSON Lines":
+        count = write_json_lines(path, worksheets)
+    elif file_format == "Excel":
+        count = write_xlsx(path, get_pack_header(), iter_pack_rows(worksheets), sheet_name="Manufacturing Pack")
+    else:
+        count = write_csv(path, get_pack_header(), iter_pack_rows(worksheets))
+
+    if not count and skip_empty:
+        os.remove(path)
+        return None
+
+    file_doc = register_private_file(path)
+
+    if user:
+        frappe.publish_realtime(
+            "manufacturing_pack_export",
+            {"file_url": file_doc.file_url},
+            user=user,
+            after_commit=True,
+        )
+
+    return file_doc
+
+
+def purge_manufacturing_packs():
+    """Remove manufacturing packs past their retention; runs daily"""
+
+    delete_old_exports(PACK_FILE_PREFIX, PACK_RETENTION_DAYS)
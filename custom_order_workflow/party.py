@@ -0,0 +1,22 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils.caching import request_cache
+
+# Columns Pre-Quotation reads from its Customer or Lead
+PARTY_FIELDS = {
+    "Customer": ("customer_primary_contact", "email_id"),
+    "Lead": ("mobile_no", "email_id", "customer", "lead_name", "company_name", "territory"),
+}
+
+
+@request_cache
+def get_party_details(doctype, name):
+    """Pre-Quotation fields of a Customer or Lead, fetched without loading the document.
+
+    Memoized for the rest of the request or job; the returned dict is shared,
+    so callers must not modify it.
+    """
+
+    return frappe.db.get_value(doctype, name, PARTY_FIELDS[doctype], as_dict=True) or frappe._dict()
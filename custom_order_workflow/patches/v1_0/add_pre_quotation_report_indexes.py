@@ -0,0 +1,8 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+from custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary import add_report_indexes
+
+
+def execute():
+    add_report_indexes()
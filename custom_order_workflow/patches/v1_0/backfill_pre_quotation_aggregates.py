@@ -0,0 +1,26 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def execute():
+    """Fill items_count, total_quantity and total_profit_amount from the items"""
+
+    frappe.db.sql("""
+        UPDATE `tabPre-Quotation` pq
+        LEFT JOIN (
+            SELECT
+                parent,
+                COUNT(*) as items_count,
+                SUM(ROUND(quantity, 2)) as total_quantity,
+                SUM(ROUND(profit_amount, 2)) as total_profit_amount
+            FROM `tabPre-Quotation Item`
+            WHERE parenttype = 'Pre-Quotation'
+            GROUP BY parent
+        ) pqi ON pqi.parent = pq.name
+        SET
+            pq.items_count = IFNULL(pqi.items_count, 0),
+            pq.total_quantity = ROUND(IFNULL(pqi.total_quantity, 0), 2),
+            pq.total_profit_amount = ROUND(IFNULL(pqi.total_profit_amount, 0), 2)
+    """)
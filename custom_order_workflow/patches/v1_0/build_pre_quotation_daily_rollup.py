@@ -0,0 +1,8 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+from custom_order_workflow.rollup import rebuild_rollup
+
+
+def execute():
+    rebuild_rollup()
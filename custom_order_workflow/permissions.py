@@ -0,0 +1,42 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.db_query import DatabaseQuery
+
+PRE_QUOTATION = "Pre-Quotation"
+
+
+def get_permission_scope():
+    """Key shared by users who see the same Pre-Quotations.
+
+    Users with the same roles and user permissions share cached results;
+    owner-restricted access or documents shared with the user make the
+    scope per user.
+    """
+
+    user = frappe.session.user
+    scope = [sorted(frappe.get_roles(user)), frappe.permissions.get_user_permissions(user)]
+
+    role_permissions = frappe.permissions.get_role_permissions(frappe.get_meta(PRE_QUOTATION), user)
+    if role_permissions.get("if_owner", {}).get("read") or has_shared_pre_quotations(user):
+        scope.append(user)
+
+    return hashlib.md5(frappe.as_json(scope).encode()).hexdigest()
+
+
+def has_shared_pre_quotations(user):
+    return bool(frappe.db.exists("DocShare", {"share_doctype": PRE_QUOTATION, "user": user, "read": 1}))
+
+
+def get_read_conditions():
+    """SQL condition limiting `tabPre-Quotation` rows to those the user can read, "" for all.
+
+    The same role, user permission, owner and share rules frappe.get_list
+    applies, for reports written as raw SQL. Percent signs are escaped for
+    use in a parameterized query.
+    """
+
+    return DatabaseQuery(PRE_QUOTATION).build_match_conditions().replace("%", "%%")
@@ -0,0 +1,366 @@
+# Copyright (c) 2024, Manus AI and contributors
+# For license information, please see license.txt
+
+from operator import attrgetter
+
+import frappe
+import numpy as np
+from frappe.utils import flt
+
+# Fields a row's price is derived from
+PRICING_FIELDS = (
+    "quantity",
+    "cost_per_unit",
+    "selling_price_per_unit",
+    "profit_margin_percent",
+    "vat_rate_item",
+)
+
+# Fields written back by price_item
+COMPUTED_FIELDS = ("total_cost", "total_selling_amount", "profit_amount")
+
+
+def price_item(item):
+    """Calculate total cost, selling amount, and profit for a single item row"""
+
+    # Total cost per unit is now directly entered or estimated
+    item.total_cost = flt(item.cost_per_unit, 2)
+
+    # Calculate selling price based on profit margin if not manually set
+    if item.profit_margin_percent and not item.selling_price_per_unit:
+        profit_multiplier = 1 + (flt(item.profit_margin_percent) / 100)
+        item.selling_price_per_unit = flt(item.total_cost * profit_multiplier, 2)
+
+    # Calculate profit margin if selling price is set but margin is not
+    elif item.selling_price_per_unit and not item.profit_margin_percent and item.total_cost > 0:
+        profit_amount_per_unit = flt(item.selling_price_per_unit) - flt(item.total_cost)
+        item.profit_margin_percent = flt((profit_amount_per_unit / item.total_cost) * 100, 2)
+
+    # Calculate total selling amount
+    quantity = flt(item.quantity, 2)
+    selling_price_per_unit = flt(item.selling_price_per_unit, 2)
+    total_cost = flt(item.total_cost, 2)
+    vat_rate_item = flt(item.vat_rate_item, 2)
+
+    # Calculate total selling amount before item VAT
+    selling_amount_before_vat_item = selling_price_per_unit * quantity
+
+    # Calculate item VAT amount
+    item_vat_amount = selling_amount_before_vat_item * (vat_rate_item / 100)
+
+    # Total selling amount including item VAT
+    item.total_selling_amount = selling_amount_before_vat_item + item_vat_amount
+
+    # Calculate profit amount
+    item.profit_amount = item.total_selling_amount - (total_cost * quantity) - item_vat_amount
+
+
+def get_signature(item):
+    """Snapshot of the pricing inputs and outputs of a row"""
+    return tuple(getattr(item, fieldname, None) for fieldname in PRICING_FIELDS + COMPUTED_FIELDS)
+
+
+def get_contribution(item):
+    """Amounts a priced row adds to the document totals as (cost, selling, profit, vat, quantity)"""
+
+    quantity = flt(item.quantity, 2)
+    total_selling_amount = flt(item.total_selling_amount, 2)
+
+    return (
+        flt(item.total_cost, 2) * quantity,
+        total_selling_amount,
+        flt(item.profit_amount, 2),
+        total_selling_amount - (flt(item.selling_price_per_unit, 2) * quantity),
+        quantity,
+    )
+
+
+class PricingEngine:
+    """Per-document pricing state.
+
+    Remembers the signature and contribution of every row it has priced, so
+    repeated calls to `update` (validate, before_save, bulk actions) only
+    reprice rows whose pricing fields changed. Document sums are added up
+    from the stored contributions in row order, exactly as a full
+    recalculation would add them.
+    """
+
+    def __init__(self):
+        # id(row) -> (row, signature, contribution)
+        self.rows = {}
+
+    def update(self, items):
+        """Reprice changed rows and return the document sums"""
+
+        seen = set()
+        for item in items:
+            key = id(item)
+            seen.add(key)
+
+            entry = self.rows.get(key)
+            if entry and entry[1] == get_signature(item):
+                continue
+
+            price_item(item)
+            self._record(item)
+
+        if len(seen) != len(self.rows):
+            for key in [key for key in self.rows if key not in seen]:
+                del self.rows[key]
+
+        return self.get_totals(items)
+
+    def mark_clean(self, item):
+        """Record a row that has just been priced outside the engine"""
+        self._record(item)
+
+    def mark_repriced(self, items, priced):
+        """Record rows repriced by reprice_items, from the (signature, contribution) it returned"""
+        for item, (signature, contribution) in zip(items, priced):
+            self.rows[id(item)] = (item, signature, contribution)
+
+    def is_dirty(self, item):
+        entry = self.rows.get(id(item))
+        return not entry or entry[1] != get_signature(item)
+
+    def get_totals(self, items=None):
+        """Document sums of the recorded rows, in the order of items when given"""
+
+        # Summed afresh rather than kept as running sums: repeated +/- updates
+        # drift in the last bits and can flip a total rounded at .xx5
+        entries = self.rows.values() if items is None else (self.rows[id(item)] for item in items)
+
+        sums = [0, 0, 0, 0, 0]
+        for _item, _signature, contribution in entries:
+            for i, value in enumerate(contribution):
+                sums[i] += value
+
+        total_cost, total_selling_price, total_profit, total_vat, total_quantity = sums
+        return frappe._dict(
+            total_cost=total_cost,
+            total_selling_price=total_selling_price,
+            total_profit=total_profit,
+            total_vat=total_vat,
+            total_quantity=total_quantity,
+            items_count=len(self.rows),
+        )
+
+    def _record(self, item):
+        self.rows[id(item)] = (item, get_signature(item), get_contribution(item))
+
+
+def load_columns(items, fieldnames):
+    """Read the given fields of all rows in one pass.
+
+    Returns the raw values of every row, as tuples in fieldnames order, and a
+    contiguous float array per field holding what flt makes of them.
+    """
+
+    values = list(map(attrgetter(*fieldnames), items))
+    try:
+        # Empty values come out as NaN, which flt makes 0
+        matrix = np.array(values, dtype=float)
+        matrix[np.isnan(matrix)] = 0
+    except (TypeError, ValueError):
+        # Text values; convert them the way flt does
+        matrix = np.array([[flt(value) for value in row] for row in values], dtype=float)
+
+    matrix = matrix.reshape(len(items), len(fieldnames))
+    return values, {fieldname: np.ascontiguousarray(matrix[:, i]) for i, fieldname in enumerate(fieldnames)}
+
+
+def reprice_items(items, profit_margin_percent=None, cost_per_unit=None):
+    """Apply a bulk margin or cost change and reprice all rows in one pass.
+
+    Produces the same values as setting the change on every row and calling
+    `price_item` on it, but evaluates the formulas over whole columns.
+    Returns the (signature, contribution) of every row, for the pricing engine.
+    """
+
+    if not items:
+        return []
+
+    values, columns = load_columns(items, PRICING_FIELDS + ("total_cost",))
+    quantity = round_array(columns["quantity"])
+    selling_price = columns["selling_price_per_unit"]
+    margin = columns["profit_margin_percent"]
+    vat_rate = round_array(columns["vat_rate_item"])
+
+    selling_changed = np.zeros(len(items), dtype=bool)
+    margin_changed = np.zeros(len(items), dtype=bool)
+
+    if cost_per_unit is not None:
+        columns["cost_per_unit"] = np.full(len(items), flt(cost_per_unit, 2))
+
+    if profit_margin_percent is not None:
+        # Selling price follows the new margin wherever a cost is already known
+        stale_cost = columns["total_cost"]
+        has_cost = stale_cost > 0
+        selling_price = np.where(
+            has_cost,
+            round_array(stale_cost * (1 + (flt(profit_margin_percent) / 100))),
+            selling_price,
+        )
+        selling_changed |= has_cost
+        margin = np.full(len(items), flt(profit_margin_percent, 2))
+        margin_changed[:] = True
+
+    total_cost = round_array(columns["cost_per_unit"])
+
+    # Selling price from margin where not manually set
+    from_margin = (margin != 0) & (selling_price == 0)
+    if from_margin.any():
+        selling_price = np.where(
+            from_margin, round_array(total_cost * (1 + (margin / 100))), selling_price
+        )
+        selling_changed |= from_margin
+
+    # Margin from selling price where not set
+    from_selling = ~from_margin & (selling_price != 0) & (margin == 0) & (total_cost > 0)
+    if from_selling.any():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            derived = ((selling_price - total_cost) / total_cost) * 100
+        margin = np.where(from_selling, round_array(np.where(from_selling, derived, 0)), margin)
+        margin_changed |= from_selling
+
+    rounded_selling_price = round_array(selling_price)
+    selling_amount_before_vat_item = rounded_selling_price * quantity
+    item_vat_amount = selling_amount_before_vat_item * (vat_rate / 100)
+    total_selling_amount = selling_amount_before_vat_item + item_vat_amount
+    profit_amount = total_selling_amount - (total_cost * quantity) - item_vat_amount
+
+    # Contribution columns, as get_contribution computes them per row
+    rounded_selling_amount = round_array(total_selling_amount)
+    contributions = zip(
+        (total_cost * quantity).tolist(),
+        rounded_selling_amount.tolist(),
+        round_array(profit_amount).tolist(),
+        (rounded_selling_amount - rounded_selling_price * quantity).tolist(),
+        quantity.tolist(),
+    )
+
+    results = zip(
+        items,
+        values,
+        total_cost.tolist(),
+        selling_price.tolist(),
+        margin.tolist(),
+        total_selling_amount.tolist(),
+        profit_amount.tolist(),
+        selling_changed.tolist(),
+        margin_changed.tolist(),
+        contributions,
+    )
+
+    priced = []
+    for item, row, cost, selling, item_margin, selling_amount, profit, set_selling, set_margin, contribution in results:
+        item_quantity, item_cost_per_unit, item_selling_price, item_profit_margin, item_vat_rate = row[:5]
+
+        if cost_per_unit is not None:
+            item.cost_per_unit = item_cost_per_unit = cost
+        item.total_cost = cost
+        if set_selling:
+            item.selling_price_per_unit = item_selling_price = selling
+        if set_margin:
+            item.profit_margin_percent = item_profit_margin = item_margin
+        item.total_selling_amount = selling_amount
+        item.profit_amount = profit
+
+        # Same order as get_signature
+        signature = (
+            item_quantity, item_cost_per_unit, item_selling_price, item_profit_margin, item_vat_rate,
+            cost, selling_amount, profit,
+        )
+        priced.append((signature, contribution))
+
+    return priced
+
+
+def round_array(values, precision=2):
+    """Vectorized `flt(value, precision)` over an array of any shape.
+
+    Away from a tie every rounding method rounds to the nearest value, so
+    those are rounded in numpy. The few values within 1e-6 of a tie go
+    through flt, which applies the site's rounding method, so the result is
+    always the one flt gives.
+    """
+
+    values = np.asarray(values, dtype=float)
+    multiplier = 10**precision
+    scaled = values * multiplier
+    rounded = np.asarray(np.rint(scaled) / multiplier)
+
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [flt(value, precision) for value in values[ties].tolist()]
+
+    return rounded
+
+
+def evaluate_scenarios(items, scenarios):
+    """Document totals for a list of what-if scenarios, without changing the rows.
+
+    Each scenario may set `profit_margin_percent` (selling price is derived
+    from cost for every row that has one), `vat_rate` (replaces every row's VAT rate) and
+    `cost_adjustment_percent` (scales every row's unit cost). Rows keep their
+    own values for anything a scenario leaves out.
+    """
+
+    _values, columns = load_columns(items, PRICING_FIELDS)
+    quantity = round_array(columns["quantity"])
+    cost = round_array(columns["cost_per_unit"])
+    vat_rate = round_array(columns["vat_rate_item"])
+
+    # Current selling price of every row, as price_item would leave it
+    margin = columns["profit_margin_percent"]
+    selling_price = columns["selling_price_per_unit"]
+    from_margin = (margin != 0) & (selling_price == 0)
+    if from_margin.any():
+        selling_price = np.where(from_margin, round_array(cost * (1 + (margin / 100))), selling_price)
+    selling_price = round_array(selling_price)
+
+    def get_param(fieldname):
+        values = [scenario.get(fieldname) for scenario in scenarios]
+        given = np.array([value not in (None, "") for value in values], dtype=bool)
+        return given[:, None], np.array([flt(value) for value in values], dtype=float)[:, None]
+
+    has_margin, scenario_margin = get_param("profit_margin_percent")
+    has_vat, scenario_vat = get_param("vat_rate")
+    has_adjustment, adjustment = get_param("cost_adjustment_percent")
+
+    # scenarios x rows
+    scenario_cost = np.where(has_adjustment, round_array(cost * (1 + (adjustment / 100))), cost)
+    # Like apply_bulk_profit_margin, rows without a cost keep their selling price
+    scenario_selling_price = np.where(
+        has_margin & (scenario_cost > 0),
+        round_array(scenario_cost * (1 + (round_array(scenario_margin) / 100))),
+        selling_price,
+    )
+    scenario_vat_rate = np.where(has_vat, round_array(scenario_vat), vat_rate)
+
+    selling_amount_before_vat_item = scenario_selling_price * quantity
+    item_vat_amount = selling_amount_before_vat_item * (scenario_vat_rate / 100)
+    total_selling_amount = round_array(selling_amount_before_vat_item + item_vat_amount)
+    profit_amount = round_array(
+        selling_amount_before_vat_item + item_vat_amount - (scenario_cost * quantity) - item_vat_amount
+    )
+
+    total_cost = (scenario_cost * quantity).sum(axis=1)
+    total_selling_price = total_selling_amount.sum(axis=1)
+    total_profit = profit_amount.sum(axis=1)
+    total_vat = (total_selling_amount - selling_amount_before_vat_item).sum(axis=1)
+
+    results = []
+    for i, scenario in enumerate(scenarios):
+        estimated_total_cost = flt(total_cost[i], 2)
+        results.append(frappe._dict(
+            scenario=scenario,
+            estimated_total_cost=estimated_total_cost,
+            estimated_selling_price=flt(total_selling_price[i], 2),
+            total_vat_amount=flt(total_vat[i], 2),
+            total_profit_amount=flt(total_profit[i], 2),
+            overall_profit_margin=flt((total_profit[i] / estimated_total_cost) * 100, 2)
+            if estimated_total_cost > 0 else 0,
+        ))
+
+    return results
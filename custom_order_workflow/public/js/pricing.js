@@ -0,0 +1,149 @@
+// Copyright (c) 2026, Manus AI and contributors
+// For license information, please see license.txt
+
+// Client side counterpart of custom_order_workflow/pricing.py. The formulas
+// must stay in step with price_item and PricingEngine: both sides are
+// checked against tests/pricing_golden_cases.json.
+
+frappe.provide("custom_order_workflow.pricing");
+
+// Milliseconds of quiet before edited rows and totals are redrawn
+custom_order_workflow.pricing.REFRESH_DELAY = 150;
+
+custom_order_workflow.pricing.price_item = function(row) {
+	// Total cost per unit is now directly entered or estimated
+	row.total_cost = flt(row.cost_per_unit, 2);
+
+	// Calculate selling price based on profit margin if not manually set
+	if (row.profit_margin_percent && !row.selling_price_per_unit) {
+		let profit_multiplier = 1 + flt(row.profit_margin_percent) / 100;
+		row.selling_price_per_unit = flt(row.total_cost * profit_multiplier, 2);
+
+	// Calculate profit margin if selling price is set but margin is not
+	} else if (row.selling_price_per_unit && !row.profit_margin_percent && row.total_cost > 0) {
+		let profit_amount_per_unit = flt(row.selling_price_per_unit) - flt(row.total_cost);
+		row.profit_margin_percent = flt((profit_amount_per_unit / row.total_cost) * 100, 2);
+	}
+
+	let quantity = flt(row.quantity, 2);
+	let selling_price_per_unit = flt(row.selling_price_per_unit, 2);
+	let total_cost = flt(row.total_cost, 2);
+	let vat_rate_item = flt(row.vat_rate_item, 2);
+
+	let selling_amount_before_vat_item = selling_price_per_unit * quantity;
+	let item_vat_amount = selling_amount_before_vat_item * (vat_rate_item / 100);
+
+	row.total_selling_amount = selling_amount_before_vat_item + item_vat_amount;
+	row.profit_amount = row.total_selling_amount - total_cost * quantity - item_vat_amount;
+};
+
+// A margin entered on the row sets its selling price, like apply_bulk_profit_margin;
+// a zero margin sells at cost. Rows without a cost keep their selling price.
+custom_order_workflow.pricing.apply_profit_margin = function(row) {
+	let total_cost = flt(row.cost_per_unit, 2);
+	if (total_cost > 0) {
+		row.selling_price_per_unit = flt(total_cost * (1 + flt(row.profit_margin_percent) / 100), 2);
+	}
+};
+
+// Amounts a priced row adds to the document totals as [cost, selling, profit, vat, quantity]
+custom_order_workflow.pricing.get_contribution = function(row) {
+	let quantity = flt(row.quantity, 2);
+	let total_selling_amount = flt(row.total_selling_amount, 2);
+
+	return [
+		flt(row.total_cost, 2) * quantity,
+		total_selling_amount,
+		flt(row.profit_amount, 2),
+		total_selling_amount - flt(row.selling_price_per_unit, 2) * quantity,
+		quantity,
+	];
+};
+
+// Document totals from the summed contributions, rounded like PreQuotation.calculate_totals
+custom_order_workflow.pricing.get_document_totals = function(sums, items_count) {
+	let [total_cost, total_selling_price, total_profit, total_vat, total_quantity] = sums;
+	let estimated_total_cost = flt(total_cost, 2);
+
+	return {
+		estimated_total_cost: estimated_total_cost,
+		estimated_selling_price: flt(total_selling_price, 2),
+		total_vat_amount: flt(total_vat, 2),
+		total_profit_amount: flt(total_profit, 2),
+		total_quantity: flt(total_quantity, 2),
+		items_count: items_count,
+		overall_profit_margin:
+			estimated_total_cost > 0 ? flt((total_profit / estimated_total_cost) * 100, 2) : 0,
+	};
+};
+
+// Per-form pricing state: an edit reprices only its row and schedules one
+// redraw for a burst of edits. Totals are added up from the stored row
+// contributions in grid order, exactly as a full recalculation adds them.
+custom_order_workflow.pricing.PricingEngine = class PricingEngine {
+	constructor(frm) {
+		this.frm = frm;
+		this.dirty_rows = new Set();
+		this.timer = null;
+		this.rebuild();
+	}
+
+	rebuild() {
+		this.contributions = {};
+		(this.frm.doc.custom_furniture_items || []).forEach((row) => this.record(row));
+	}
+
+	update_row(row) {
+		custom_order_workflow.pricing.price_item(row);
+		this.record(row);
+		this.dirty_rows.add(row.name);
+		this.schedule_refresh();
+	}
+
+	remove_row(cdn) {
+		delete this.contributions[cdn];
+		this.dirty_rows.delete(cdn);
+		this.schedule_refresh();
+	}
+
+	get_totals() {
+		// Summed afresh rather than kept as running sums: repeated +/- updates
+		// drift in the last bits and can flip a total rounded at .xx5
+		let rows = this.frm.doc.custom_furniture_items || [];
+		let sums = [0, 0, 0, 0, 0];
+		rows.forEach((row) => {
+			let contribution =
+				this.contributions[row.name] || custom_order_workflow.pricing.get_contribution(row);
+			contribution.forEach((value, i) => {
+				sums[i] += value;
+			});
+		});
+
+		return custom_order_workflow.pricing.get_document_totals(sums, rows.length);
+	}
+
+	record(row) {
+		this.contributions[row.name] = custom_order_workflow.pricing.get_contribution(row);
+	}
+
+	schedule_refresh() {
+		clearTimeout(this.timer);
+		this.timer = setTimeout(() => this.refresh(), custom_order_workflow.pricing.REFRESH_DELAY);
+	}
+
+	refresh() {
+		this.timer = null;
+
+		// Redraw only the edited rows instead of the whole grid
+		let grid = this.frm.fields_dict.custom_furniture_items.grid;
+		this.dirty_rows.forEach((cdn) => {
+			let grid_row = grid.grid_rows_by_docname[cdn];
+			if (grid_row) {
+				grid_row.refresh();
+			}
+		});
+		this.dirty_rows.clear();
+
+		this.frm.set_value(this.get_totals());
+	}
+};
@@ -0,0 +1,83 @@
+// Copyright (c) 2026, Manus AI and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Pre-Quotation Summary"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "customer",
+			label: __("Customer"),
+			fieldtype: "Link",
+			options: "Customer",
+		},
+		{
+			fieldname: "status",
+			label: __("Status"),
+			fieldtype: "Select",
+			options: [
+				"",
+				"Draft",
+				"Submitted to Manufacturing",
+				"Costing Done",
+				"Approved Internally",
+				"Converted to Quotation",
+				"Rejected",
+				"Cancelled",
+			],
+		},
+		{
+			fieldname: "owner",
+			label: __("Owner"),
+			fieldtype: "Link",
+			options: "User",
+		},
+		{
+			// Keyset cursor of the last row on the previous page
+			fieldname: "after",
+			fieldtype: "Data",
+			hidden: 1,
+		},
+	],
+
+	onload: function(report) {
+		report.page.add_inner_button(__("First Page"), function() {
+			report.set_filter_value("after", "");
+		});
+
+		report.page.add_inner_button(__("Next Page"), function() {
+			let data = report.data || [];
+			let last = data[data.length - 1];
+			if (last && last.name) {
+				report.set_filter_value("after", `${last.creation}|${last.name}`);
+			}
+		});
+
+		["CSV", "Excel"].forEach(function(file_format) {
+			report.page.add_inner_button(__(file_format), function() {
+				frappe.call({
+					method: "custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary.export_report",
+					args: {
+						filters: report.get_filter_values(),
+						file_format: file_format,
+					},
+					callback: function() {
+						frappe.show_alert(__("Export started, the download will open when it is ready"));
+					},
+				});
+			}, __("Export"));
+		});
+
+		frappe.realtime.on("pre_quotation_summary_export", function(data) {
+			window.open(data.file_url);
+		});
+	},
+};
@@ -3,11 +3,59 @@
 
 import frappe
 from frappe import _
+from frappe.utils import cint
+
+from custom_order_workflow.exports import (
+    delete_old_exports,
+    get_export_path,
+    register_private_file,
+    write_csv,
+    write_xlsx,
+)
+from custom_order_workflow.permissions import get_read_conditions
+from custom_order_workflow.report_cache import get_cached_result
+
+# Composite indexes on Pre-Quotation for the report filters: an equality
+# filter first, then the date range; and, for paging, the equality filter
+# followed by the (creation, name) sort key
+REPORT_INDEXES = (
+    ("pre_quotation_date",),
+    ("status", "pre_quotation_date"),
+    ("customer", "pre_quotation_date"),
+    ("owner", "pre_quotation_date"),
+    ("creation", "name"),
+    ("status", "creation", "name"),
+    ("customer", "creation", "name"),
+    ("owner", "creation", "name"),
+)
+
+# Rows shown per report page; the next page continues after the last row
+REPORT_PAGE_LENGTH = 500
+
+# Rows fetched per query while streaming an export
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_FORMATS = ("CSV", "Excel")
+
+# Exports are private files named with this prefix, kept for a week
+EXPORT_FILE_PREFIX = "pre_quotation_summary_"
+EXPORT_RETENTION_DAYS = 7
 
 def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    return get_cached_result("Pre-Quotation Summary", filters, get_result)
+
+def get_result(filters):
+    page_length = cint(filters.get("page_length")) or REPORT_PAGE_LENGTH
+    
     columns = get_columns()
-    data = get_data(filters)
-    return columns, data
+    data = get_data(filters, after=filters.get("after"), page_length=page_length)
+    
+    message = None
+    if len(data) == page_length:
+        message = _("Showing {0} rows. Use Next Page to continue, or Export for all rows.").format(page_length)
+    
+    return columns, data, message
 
 def get_columns():
     return [
@@ -76,47 +124,147 @@ def get_columns():
         }
     ]
 
-def get_data(filters):
-    conditions = get_conditions(filters)
+def get_data(filters, after=None, page_length=None):
+    query, values = get_query(filters, after=after, page_length=page_length)
+    return frappe.db.sql(query, values, as_dict=1)
+
+def get_query(filters, after=None, page_length=None):
+    """Report query and its parameter values.
+    
+    Rows are ordered by (creation, name) descending; `after` is the cursor
+    of the last row already returned (see get_cursor), so no page skips
+    rows with an OFFSET. Unfiltered pages and pages filtered on status,
+    customer or owner are read in order from a (field, creation, name)
+    index and stop at the page length; a date range alone still sorts the
+    rows it matches.
+    """
+    conditions, values = get_conditions(filters)
+    
+    if after:
+        values["after_creation"], values["after_name"] = after.split("|", 1)
+        conditions += """ AND (creation < %(after_creation)s
+            OR (creation = %(after_creation)s AND name < %(after_name)s))"""
+    
+    limit = ""
+    if page_length:
+        limit = "LIMIT %(page_length)s"
+        values["page_length"] = cint(page_length)
     
-    data = frappe.db.sql(f"""
+    # items_count is maintained on save, so the child table is not read
+    query = f"""
         SELECT 
-            pq.name,
-            pq.pre_quotation_date,
-            pq.customer,
-            pq.contact_person,
-            pq.status,
-            COUNT(pqi.name) as items_count,
-            pq.estimated_total_cost,
-            pq.estimated_selling_price,
-            pq.owner,
-            DATEDIFF(CURDATE(), pq.creation) as days_old
-        FROM `tabPre-Quotation` pq
-        LEFT JOIN `tabPre-Quotation Item` pqi ON pqi.parent = pq.name
-        WHERE pq.docstatus != 2 {conditions}
-        GROUP BY pq.name
-        ORDER BY pq.creation DESC
-    """, as_dict=1)
-    
-    return data
+            name,
+            pre_quotation_date,
+            customer,
+            contact_person,
+            status,
+            items_count,
+            estimated_total_cost,
+            estimated_selling_price,
+            owner,
+            DATEDIFF(CURDATE(), creation) as days_old,
+            creation
+        FROM `tabPre-Quotation`
+        WHERE docstatus != 2 {conditions}
+        ORDER BY creation DESC, name DESC
+        {limit}
+    """
+    
+    return query, values
+
+def get_cursor(row):
+    """Keyset cursor continuing after a report row"""
+    return f"{row.creation}|{row.name}"
 
 def get_conditions(filters):
+    """SQL conditions with placeholders for the given filters, and their values"""
+    filters = filters or {}
     conditions = ""
+    values = {}
     
     if filters.get("from_date"):
-        conditions += f" AND pq.pre_quotation_date >= '{filters.get('from_date')}'"
+        conditions += " AND pre_quotation_date >= %(from_date)s"
+        values["from_date"] = filters.get("from_date")
     
     if filters.get("to_date"):
-        conditions += f" AND pq.pre_quotation_date <= '{filters.get('to_date')}'"
+        conditions += " AND pre_quotation_date <= %(to_date)s"
+        values["to_date"] = filters.get("to_date")
+    
+    for fieldname in ("customer", "status", "owner"):
+        if filters.get(fieldname):
+            conditions += f" AND {fieldname} = %({fieldname})s"
+            values[fieldname] = filters.get(fieldname)
+    
+    # Only the rows the user may read, as in the list view
+    read_conditions = get_read_conditions()
+    if read_conditions:
+        conditions += f" AND ({read_conditions})"
+    
+    return conditions, values
+
+def add_report_indexes():
+    """Add REPORT_INDEXES; run by a patch and on every Pre-Quotation doctype sync"""
+    for fields in REPORT_INDEXES:
+        frappe.db.add_index("Pre-Quotation", list(fields), index_name="_".join(fields) + "_index")
+
+def iter_data(filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield all matching rows, fetching one keyset page at a time"""
+    after = None
+    while True:
+        rows = get_data(filters, after=after, page_length=chunk_size)
+        yield from rows
+        
+        if len(rows) < chunk_size:
+            return
+        
+        after = get_cursor(rows[-1])
+
+@frappe.whitelist()
+def export_report(filters=None, file_format="CSV"):
+    """Queue an export of all matching rows; the file is announced over realtime"""
+    frappe.has_permission("Pre-Quotation", "export", throw=True)
+    
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(EXPORT_FORMATS)))
+    
+    filters = frappe.parse_json(filters or "{}")
+    filters.pop("after", None)
+    
+    frappe.enqueue(
+        "custom_order_workflow.report.pre_quotation_summary.pre_quotation_summary.build_export",
+        queue="long",
+        filters=filters,
+        file_format=file_format,
+    )
+    
+    return {"queued": True}
+
+def build_export(filters, file_format="CSV"):
+    """Stream the report into a private file, chunk by chunk"""
+    columns = get_columns()
+    extension = "xlsx" if file_format == "Excel" else "csv"
+    path = get_export_path(f"{EXPORT_FILE_PREFIX}{frappe.generate_hash(length=10)}.{extension}")
     
-    if filters.get("customer"):
-        conditions += f" AND pq.customer = '{filters.get('customer')}'"
+    header = [column["label"] for column in columns]
+    rows = (
+        [row.get(column["fieldname"]) for column in columns]
+        for row in iter_data(frappe._dict(filters))
+    )
     
-    if filters.get("status"):
-        conditions += f" AND pq.status = '{filters.get('status')}'"
+    if file_format == "Excel":
+        write_xlsx(path, header, rows, sheet_name="Pre-Quotation Summary")
+    else:
+        write_csv(path, header, rows)
     
-    if filters.get("owner"):
-        conditions += f" AND pq.owner = '{filters.get('owner')}'"
+    file_doc = register_private_file(path, "Report", "Pre-Quotation Summary")
     
-    return conditions
+    frappe.publish_realtime(
+        "pre_quotation_summary_export",
+        {"file_url": file_doc.file_url},
+        user=frappe.session.user,
+        after_commit=True,
+    )
 
+def purge_exports():
+    """Remove report exports past their retention; runs daily"""
+    delete_old_exports(EXPORT_FILE_PREFIX, EXPORT_RETENTION_DAYS)
@@ -0,0 +1,19 @@
+// Copyright (c) 2026, Manus AI and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Pre-Quotation Workflow Analytics"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_months(frappe.datetime.get_today(), -3),
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+		},
+	],
+};
@@ -0,0 +1,189 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, getdate
+
+from custom_order_workflow.transitions import FUNNEL_STATES
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    columns = get_columns()
+    data = get_data(filters)
+    return columns, data
+
+def get_columns():
+    return [
+        {
+            "label": _("State"),
+            "fieldname": "state",
+            "fieldtype": "Data",
+            "width": 200
+        },
+        {
+            "label": _("Entered"),
+            "fieldname": "entered",
+            "fieldtype": "Int",
+            "width": 100
+        },
+        {
+            "label": _("Moved to Next Stage"),
+            "fieldname": "moved_to_next",
+            "fieldtype": "Int",
+            "width": 140
+        },
+        {
+            "label": _("Stage Conversion"),
+            "fieldname": "stage_conversion",
+            "fieldtype": "Percent",
+            "width": 130
+        },
+        {
+            "label": _("Conversion from Draft"),
+            "fieldname": "overall_conversion",
+            "fieldtype": "Percent",
+            "width": 150
+        },
+        {
+            "label": _("Exits"),
+            "fieldname": "exits",
+            "fieldtype": "Int",
+            "width": 80
+        },
+        {
+            "label": _("Median Hours in State"),
+            "fieldname": "median_hours",
+            "fieldtype": "Float",
+            "width": 150
+        },
+        {
+            "label": _("P90 Hours in State"),
+            "fieldname": "p90_hours",
+            "fieldtype": "Float",
+            "width": 140
+        }
+    ]
+
+def get_data(filters):
+    conditions, values = get_conditions(filters)
+    entered = get_entered_counts(conditions, values)
+    moved = get_moved_counts(filters)
+    durations = get_time_in_state(conditions, values)
+
+    data = []
+    draft_count = entered.get(FUNNEL_STATES[0], 0)
+    for i, state in enumerate(FUNNEL_STATES):
+        count = entered.get(state, 0)
+        row = frappe._dict(state=state, entered=count)
+
+        if i + 1 < len(FUNNEL_STATES):
+            row.moved_to_next = moved.get(state, 0)
+            row.stage_conversion = flt(row.moved_to_next * 100 / count, 2) if count else 0
+
+        row.overall_conversion = flt(count * 100 / draft_count, 2) if draft_count else 0
+        row.update(durations.get(state, {}))
+        data.append(row)
+
+    # Side states such as Rejected only get their counts and durations
+    for state in sorted(set(entered) | set(durations)):
+        if state not in FUNNEL_STATES:
+            row = frappe._dict(state=state, entered=entered.get(state, 0))
+            row.update(durations.get(state, {}))
+            data.append(row)
+
+    return data
+
+def get_entered_counts(conditions, values):
+    """Documents that entered each state, in one grouped query"""
+    return dict(frappe.db.sql(f"""
+        SELECT to_state, COUNT(DISTINCT pre_quotation)
+        FROM `tabPre-Quotation Transition`
+        WHERE COALESCE(to_state, '') != '' {conditions}
+        GROUP BY to_state
+    """, values))
+
+def get_moved_counts(filters):
+    """Documents that entered each funnel state in the period and went on to the next one.
+
+    The next step may happen after the period; documents that only left
+    the state in the period, having entered it before, are not counted.
+    """
+    conditions, values = get_conditions(filters, table="entered")
+    steps = ", ".join(
+        f"({frappe.db.escape(state)}, {frappe.db.escape(next_state)})"
+        for state, next_state in zip(FUNNEL_STATES, FUNNEL_STATES[1:])
+    )
+
+    return dict(frappe.db.sql(f"""
+        SELECT entered.to_state, COUNT(DISTINCT moved.pre_quotation)
+        FROM `tabPre-Quotation Transition` entered
+        INNER JOIN `tabPre-Quotation Transition` moved
+            ON moved.pre_quotation = entered.pre_quotation
+            AND moved.from_state = entered.to_state
+            AND moved.transition_date >= entered.transition_date
+        WHERE (moved.from_state, moved.to_state) IN ({steps}) {conditions}
+        GROUP BY entered.to_state
+    """, values))
+
+def get_time_in_state(conditions, values):
+    """Exits and median/p90 time spent per state, computed in the database"""
+    if frappe.db.db_type == "postgres":
+        # An ordered-set aggregate in PostgreSQL
+        query = f"""
+            SELECT
+                from_state as state,
+                COUNT(*) as exits,
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY time_in_from_state) as median_seconds,
+                PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY time_in_from_state) as p90_seconds
+            FROM `tabPre-Quotation Transition`
+            WHERE COALESCE(from_state, '') != '' {conditions}
+            GROUP BY from_state
+        """
+    else:
+        # A window function in MariaDB, which has no ordered-set aggregates
+        query = f"""
+            SELECT
+                state,
+                COUNT(*) as exits,
+                MAX(median_seconds) as median_seconds,
+                MAX(p90_seconds) as p90_seconds
+            FROM (
+                SELECT
+                    from_state as state,
+                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY time_in_from_state)
+                        OVER (PARTITION BY from_state) as median_seconds,
+                    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY time_in_from_state)
+                        OVER (PARTITION BY from_state) as p90_seconds
+                FROM `tabPre-Quotation Transition`
+                WHERE COALESCE(from_state, '') != '' {conditions}
+            ) durations
+            GROUP BY state
+        """
+
+    rows = frappe.db.sql(query, values, as_dict=1)
+
+    return {
+        row.state: {
+            "exits": row.exits,
+            "median_hours": flt(flt(row.median_seconds) / 3600, 2),
+            "p90_hours": flt(flt(row.p90_seconds) / 3600, 2)
+        }
+        for row in rows
+    }
+
+def get_conditions(filters, table=None):
+    """Transition date conditions with placeholders, and their values"""
+    column = f"{table}.transition_date" if table else "transition_date"
+    conditions = ""
+    values = {}
+
+    if filters.get("from_date"):
+        conditions += f" AND {column} >= %(from_date)s"
+        values["from_date"] = filters.get("from_date")
+
+    if filters.get("to_date"):
+        conditions += f" AND {column} < %(before_date)s"
+        values["before_date"] = add_days(getdate(filters.get("to_date")), 1)
+
+    return conditions, values
@@ -0,0 +1,62 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.utils import nowdate
+
+from custom_order_workflow.permissions import get_permission_scope
+
+# Redis counter bumped by every Pre-Quotation write
+DATA_VERSION_KEY = "custom_order_workflow:pre_quotation_data_version"
+
+# Entries of older versions are never read again and expire on their own
+REPORT_CACHE_TTL = 6 * 60 * 60
+
+
+def get_data_version():
+    return int(frappe.cache().get(frappe.cache().make_key(DATA_VERSION_KEY)) or 0)
+
+
+def bump_data_version(doc=None, method=None):
+    """Invalidate all cached report results; hooked to Pre-Quotation writes"""
+    increment_data_version()
+
+    # Again after commit, so results read before the commit are not served
+    frappe.db.after_commit.add(increment_data_version)
+
+
+def increment_data_version():
+    frappe.cache().incr(frappe.cache().make_key(DATA_VERSION_KEY))
+
+
+def normalize_filters(filters):
+    """Filters without empty values, with keys sorted and values as strings"""
+    return {key: str(value) for key, value in sorted((filters or {}).items()) if value not in (None, "", [])}
+
+
+def get_report_cache_key(report_name, filters):
+    # Language and date are part of the key for the translated labels and days_old
+    key = frappe.as_json([
+        normalize_filters(filters),
+        get_permission_scope(),
+        frappe.local.lang,
+        nowdate(),
+    ])
+
+    return "custom_order_workflow:report:{0}:{1}:{2}".format(
+        report_name, get_data_version(), hashlib.md5(key.encode()).hexdigest()
+    )
+
+
+def get_cached_result(report_name, filters, execute):
+    """Result of execute(filters), served from cache until Pre-Quotation data changes"""
+    key = get_report_cache_key(report_name, filters)
+
+    result = frappe.cache().get_value(key)
+    if result is None:
+        result = execute(filters)
+        frappe.cache().set_value(key, result, expires_in_sec=REPORT_CACHE_TTL)
+
+    return result
@@ -0,0 +1,191 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.utils import add_days, flt, getdate, now_datetime
+
+ROLLUP_DOCTYPE = "Pre-Quotation Daily Rollup"
+
+# Pre-Quotation amounts summed into each rollup row
+ROLLUP_MEASURES = ("estimated_total_cost", "estimated_selling_price", "total_profit_amount")
+
+# Days of rollup rows rebuild_rollup recomputes per transaction
+REBUILD_CHUNK_DAYS = 31
+
+
+def get_rollup_entry(doc):
+    """(bucket, contribution) a Pre-Quotation adds to the rollup, None if it adds nothing"""
+
+    if not doc or doc.docstatus == 2:
+        return None
+
+    bucket = (
+        getdate(doc.pre_quotation_date or doc.creation),
+        doc.status or "",
+        doc.owner or "",
+        doc.customer or "",
+    )
+    return bucket, (1, *(flt(doc.get(fieldname)) for fieldname in ROLLUP_MEASURES))
+
+
+def get_rollup_name(bucket):
+    # Hashed the same way by rebuild_rollup, so incremental updates upsert by primary key.
+    # Lowercased and right-trimmed like MariaDB compares them, so "ACME" and
+    # "Acme " land in one row
+    return hashlib.md5("|".join(str(value).rstrip(" ") for value in bucket).lower().encode()).hexdigest()
+
+
+def update_rollup(doc, method=None):
+    """Move a Pre-Quotation's contribution between rollup buckets; hooked to its doc events"""
+
+    if method == "on_trash":
+        apply_rollup_delta(get_rollup_entry(doc), None)
+    else:
+        apply_rollup_delta(get_rollup_entry(doc.get_doc_before_save()), get_rollup_entry(doc))
+
+
+def apply_rollup_delta(old, new):
+    """Subtract the old entry and add the new one, skipping buckets left unchanged"""
+
+    if old == new:
+        return
+
+    deltas = {}
+    for entry, sign in ((old, -1), (new, 1)):
+        if not entry:
+            continue
+
+        bucket, contribution = entry
+        delta = deltas.setdefault(bucket, [0] * len(contribution))
+        for i, value in enumerate(contribution):
+            delta[i] += sign * value
+
+    for bucket, delta in deltas.items():
+        if any(delta):
+            upsert_rollup_row(bucket, delta)
+
+
+def upsert_rollup_row(bucket, delta):
+    # Atomic increment, so concurrent saves landing in one bucket do not race
+    date, status, owner, customer = bucket
+    now = now_datetime()
+
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{ROLLUP_DOCTYPE}`
+            (name, creation, modified, owner, modified_by,
+            date, status, pre_quotation_owner, customer,
+            pre_quotation_count, estimated_total_cost, estimated_selling_price, total_profit_amount)
+        VALUES
+            (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator',
+            %(date)s, %(status)s, %(owner)s, %(customer)s,
+            %(count)s, %(cost)s, %(selling)s, %(profit)s)
+        ON DUPLICATE KEY UPDATE
+            pre_quotation_count = pre_quotation_count + VALUES(pre_quotation_count),
+            estimated_total_cost = estimated_total_cost + VALUES(estimated_total_cost),
+            estimated_selling_price = estimated_selling_price + VALUES(estimated_selling_price),
+            total_profit_amount = total_profit_amount + VALUES(total_profit_amount),
+            modified = VALUES(modified)
+        """,
+        {
+            "name": get_rollup_name(bucket),
+            "now": now,
+            "date": date,
+            "status": status,
+            "owner": owner,
+            "customer": customer,
+            "count": delta[0],
+            "cost": delta[1],
+            "selling": delta[2],
+            "profit": delta[3],
+        },
+    )
+
+
+def enqueue_rebuild_rollup():
+    frappe.enqueue(
+        "custom_order_workflow.rollup.rebuild_rollup",
+        queue="long",
+        job_id="custom_order_workflow:rebuild_pre_quotation_rollup",
+        deduplicate=True,
+    )
+
+
+def rebuild_rollup():
+    """Recompute every rollup row from Pre-Quotation, dropping any drift.
+
+    Rows are recomputed a date range at a time, each range in its own short
+    transaction, so saves only wait for the range they fall in and their
+    incremental updates apply on top of the recomputed rows.
+    """
+
+    start, end = get_rollup_date_range()
+    while start and start <= end:
+        chunk_end = add_days(start, REBUILD_CHUNK_DAYS - 1)
+        rebuild_rollup_range(start, chunk_end)
+        frappe.db.commit()
+        start = add_days(chunk_end, 1)
+
+
+def get_rollup_date_range():
+    """First and last date of any Pre-Quotation or rollup row, (None, None) when there are none"""
+
+    source = frappe.db.sql(
+        """
+        SELECT MIN(IFNULL(pre_quotation_date, DATE(creation))), MAX(IFNULL(pre_quotation_date, DATE(creation)))
+        FROM `tabPre-Quotation`
+        WHERE docstatus < 2
+        """
+    )[0]
+    rollup = frappe.db.sql(f"SELECT MIN(date), MAX(date) FROM `tab{ROLLUP_DOCTYPE}`")[0]
+
+    dates = [getdate(value) for value in (*source, *rollup) if value]
+    return (min(dates), max(dates)) if dates else (None, None)
+
+
+def rebuild_rollup_range(from_date, to_date):
+    values = {"from_date": from_date, "to_date": to_date, "next_date": add_days(to_date, 1)}
+
+    frappe.db.sql(
+        f"DELETE FROM `tab{ROLLUP_DOCTYPE}` WHERE date BETWEEN %(from_date)s AND %(to_date)s", values
+    )
+
+    # Grouped by the same normalized hash get_rollup_name computes
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{ROLLUP_DOCTYPE}`
+            (name, creation, modified, owner, modified_by,
+            date, status, pre_quotation_owner, customer,
+            pre_quotation_count, estimated_total_cost, estimated_selling_price, total_profit_amount)
+        SELECT
+            name, NOW(6), NOW(6), 'Administrator', 'Administrator',
+            MAX(date), MAX(status), MAX(owner), MAX(customer),
+            COUNT(*), SUM(estimated_total_cost), SUM(estimated_selling_price), SUM(total_profit_amount)
+        FROM (
+            SELECT
+                MD5(LOWER(CONCAT_WS('|', date, RTRIM(status), RTRIM(owner), RTRIM(customer)))) as name,
+                date, status, owner, customer,
+                estimated_total_cost, estimated_selling_price, total_profit_amount
+            FROM (
+                SELECT
+                    IFNULL(pre_quotation_date, DATE(creation)) as date,
+                    IFNULL(status, '') as status,
+                    IFNULL(owner, '') as owner,
+                    IFNULL(customer, '') as customer,
+                    IFNULL(estimated_total_cost, 0) as estimated_total_cost,
+                    IFNULL(estimated_selling_price, 0) as estimated_selling_price,
+                    IFNULL(total_profit_amount, 0) as total_profit_amount
+                FROM `tabPre-Quotation`
+                WHERE docstatus < 2
+                    AND (
+                        pre_quotation_date BETWEEN %(from_date)s AND %(to_date)s
+                        OR (pre_quotation_date IS NULL AND creation >= %(from_date)s AND creation < %(next_date)s)
+                    )
+            ) source
+        ) pq
+        GROUP BY name
+        """,
+        values,
+    )
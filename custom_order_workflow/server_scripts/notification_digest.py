@@ -0,0 +1,125 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now_datetime
+
+from custom_order_workflow.server_scripts.notification_outbox import (
+    DIGEST_STATE_ROLES,
+    get_digest_intervals,
+    get_notification_docs,
+)
+from custom_order_workflow.server_scripts.pre_quotation_hooks import get_users_with_role
+
+# Pre-Quotations listed in one digest; totals still cover all of them
+DIGEST_MAX_LISTED = 500
+
+
+def send_hourly_digests():
+    send_digests("Hourly")
+
+
+def send_daily_digests():
+    send_digests("Daily")
+
+
+def send_digests(interval):
+    """Send one summary per digest role whose interval is due"""
+
+    intervals = get_digest_intervals()
+    for workflow_state, role in DIGEST_STATE_ROLES.items():
+        # Intents left over from a role taken out of digest mode go out hourly
+        if intervals.get(role, "Hourly") != interval:
+            continue
+
+        send_digest(workflow_state, role)
+        frappe.db.commit()
+
+
+def send_digest(workflow_state, role):
+    intents = frappe.get_all(
+        "Pre-Quotation Notification",
+        filters={"status": "Digest", "workflow_state": workflow_state},
+        fields=["name", "pre_quotation"],
+        order_by="creation asc",
+    )
+    if not intents:
+        return
+
+    recipients = get_users_with_role(role)
+    if recipients:
+        # A Pre-Quotation that reached the state twice is listed once
+        names = list(dict.fromkeys(intent.pre_quotation for intent in intents))
+        docs = get_notification_docs(names)
+        docs = [docs[name] for name in names if name in docs]
+
+        if docs:
+            try:
+                frappe.sendmail(
+                    recipients=recipients,
+                    subject=_("Pre-Quotation Digest: {0} ({1})").format(workflow_state, len(docs)),
+                    message=get_digest_message(workflow_state, docs),
+                )
+
+            except Exception:
+                # Left in digest status for the next run
+                frappe.log_error(f"Pre-Quotation Digest Error: {workflow_state}")
+                return
+
+    frappe.db.set_value(
+        "Pre-Quotation Notification",
+        {"name": ["in", [intent.name for intent in intents]]},
+        {"status": "Sent", "sent_on": now_datetime()},
+        update_modified=False,
+    )
+
+
+def get_digest_message(workflow_state, docs):
+    rows = "".join(
+        """
+        <tr>
+            <td><a href="/app/pre-quotation/{0}">{0}</a></td>
+            <td>{1}</td>
+            <td>{2}</td>
+            <td>{3}</td>
+            <td>{4}</td>
+        </tr>""".format(
+            doc.name,
+            doc.customer or "",
+            doc.items_count,
+            frappe.format_value(doc.estimated_total_cost, "Currency"),
+            frappe.format_value(doc.estimated_selling_price, "Currency"),
+        )
+        for doc in docs[:DIGEST_MAX_LISTED]
+    )
+
+    more = ""
+    if len(docs) > DIGEST_MAX_LISTED:
+        more = _("<p>... and {0} more.</p>").format(len(docs) - DIGEST_MAX_LISTED)
+
+    return _("""
+        <p>{0} Pre-Quotations moved to <strong>{1}</strong> since the last digest.</p>
+        <p><strong>Items Count:</strong> {2}</p>
+        <p><strong>Estimated Total Cost:</strong> {3}</p>
+        <p><strong>Estimated Selling Price:</strong> {4}</p>
+        
+        <table border="1" cellpadding="4" cellspacing="0">
+        <tr>
+            <th>Pre-Quotation</th>
+            <th>Customer</th>
+            <th>Items</th>
+            <th>Estimated Total Cost</th>
+            <th>Estimated Selling Price</th>
+        </tr>{5}
+        </table>
+        {6}
+        """).format(
+        len(docs),
+        workflow_state,
+        sum(doc.items_count for doc in docs),
+        frappe.format_value(sum(flt(doc.estimated_total_cost) for doc in docs), "Currency"),
+        frappe.format_value(sum(flt(doc.estimated_selling_price) for doc in docs), "Currency"),
+        rows,
+        more,
+    )
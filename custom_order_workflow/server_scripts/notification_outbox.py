@@ -0,0 +1,188 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import add_days, add_to_date, cint, now_datetime
+
+# Workflow states that notify someone; send_status_notification renders each one
+NOTIFIED_STATES = (
+    "Submitted to Manufacturing",
+    "Costing Done",
+    "Approved Internally",
+    "Rejected",
+)
+
+# Intents handled per consumer run; the next run picks up the rest
+OUTBOX_BATCH_SIZE = 200
+
+OUTBOX_JOB_ID = "custom_order_workflow:pre_quotation_notification_outbox"
+
+# Sends tried per intent before it is marked Failed; retries back off
+# exponentially from the base delay
+MAX_NOTIFICATION_ATTEMPTS = 5
+RETRY_BASE_DELAY_MINUTES = 5
+
+# Days Sent and Failed intents are kept before purge_notification_outbox deletes them
+NOTIFICATION_RETENTION_DAYS = 30
+
+# Role emailed for each state whose notifications can be sent as a periodic digest
+DIGEST_STATE_ROLES = {
+    "Submitted to Manufacturing": "Manufacturing User",
+    "Costing Done": "Sales Manager",
+}
+
+# Pre-Quotation values the notification templates use
+NOTIFICATION_FIELDS = [
+    "name",
+    "customer",
+    "contact_person",
+    "estimated_total_cost",
+    "estimated_selling_price",
+    "items_count",
+    "owner",
+]
+
+
+def record_notification(doc):
+    """Queue a notification for the current status of a Pre-Quotation.
+
+    The intent is a row in the save's transaction, so a rolled back save
+    leaves nothing to send, and the consumer job only starts after commit.
+    Intents for roles in digest mode wait for the scheduled digest instead.
+    """
+
+    if doc.status not in NOTIFIED_STATES:
+        return
+
+    status = get_intent_status(doc.status)
+    frappe.get_doc({
+        "doctype": "Pre-Quotation Notification",
+        "pre_quotation": doc.name,
+        "workflow_state": doc.status,
+        "status": status,
+    }).insert(ignore_permissions=True)
+
+    if status == "Pending":
+        enqueue_outbox(enqueue_after_commit=True)
+
+
+def get_intent_status(workflow_state):
+    role = DIGEST_STATE_ROLES.get(workflow_state)
+    return "Digest" if role and role in get_digest_intervals() else "Pending"
+
+
+def get_digest_intervals():
+    """Role -> interval of the roles set to digest mode"""
+
+    settings = frappe.get_cached_doc("Pre-Quotation Notification Settings")
+    return {row.role: row.interval for row in settings.digest_roles}
+
+
+def enqueue_outbox(enqueue_after_commit=False):
+    """Start the outbox consumer unless it is already queued or running"""
+
+    frappe.enqueue(
+        "custom_order_workflow.server_scripts.notification_outbox.process_outbox",
+        queue="short",
+        job_id=OUTBOX_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=enqueue_after_commit,
+    )
+
+
+def process_outbox():
+    """Render and send pending workflow notifications in batches"""
+
+    while True:
+        intents = frappe.get_all(
+            "Pre-Quotation Notification",
+            filters={"status": "Pending"},
+            # Intents waiting out a retry delay are left for a later run
+            or_filters=[
+                ["next_attempt_on", "is", "not set"],
+                ["next_attempt_on", "<=", now_datetime()],
+            ],
+            fields=["name", "pre_quotation", "workflow_state", "attempts"],
+            order_by="creation asc",
+            limit=OUTBOX_BATCH_SIZE,
+        )
+        if not intents:
+            return
+
+        send_notifications(intents)
+        frappe.db.commit()
+
+        if len(intents) < OUTBOX_BATCH_SIZE:
+            return
+
+
+def send_notifications(intents):
+    # Imported here as pre_quotation_hooks imports this module
+    from custom_order_workflow.server_scripts.pre_quotation_hooks import send_status_notification
+
+    docs = get_notification_docs({intent.pre_quotation for intent in intents})
+
+    sent = []
+    for intent in intents:
+        doc = docs.get(intent.pre_quotation)
+
+        try:
+            if doc:
+                send_status_notification(doc, intent.workflow_state)
+            sent.append(intent.name)
+
+        except Exception as e:
+            frappe.log_error(f"Pre-Quotation Notification Error: {intent.pre_quotation}")
+            record_failed_attempt(intent, str(e))
+
+    if sent:
+        frappe.db.set_value(
+            "Pre-Quotation Notification",
+            {"name": ["in", sent]},
+            {"status": "Sent", "sent_on": now_datetime()},
+            update_modified=False,
+        )
+
+
+def record_failed_attempt(intent, error):
+    """Schedule a retry of a failed intent, or mark it Failed after the last attempt"""
+
+    attempts = cint(intent.attempts) + 1
+    values = {"attempts": attempts, "error": error}
+
+    if attempts >= MAX_NOTIFICATION_ATTEMPTS:
+        values.update(status="Failed", next_attempt_on=None)
+    else:
+        values["next_attempt_on"] = add_to_date(
+            now_datetime(), minutes=get_retry_delay(attempts)
+        )
+
+    frappe.db.set_value("Pre-Quotation Notification", intent.name, values, update_modified=False)
+
+
+def get_retry_delay(attempts):
+    """Minutes to wait before the next send, doubling with every failed attempt"""
+    return RETRY_BASE_DELAY_MINUTES * 2 ** (attempts - 1)
+
+
+def purge_notification_outbox():
+    """Delete Sent and Failed intents older than the retention period; runs daily"""
+
+    frappe.db.delete(
+        "Pre-Quotation Notification",
+        {
+            "status": ["in", ("Sent", "Failed")],
+            "creation": ["<", add_days(now_datetime(), -NOTIFICATION_RETENTION_DAYS)],
+        },
+    )
+
+
+def get_notification_docs(names):
+    """Pre-Quotation values for the notification templates, in one query"""
+
+    return {
+        doc.name: doc
+        for doc in frappe.get_all(
+            "Pre-Quotation", filters={"name": ["in", list(names)]}, fields=NOTIFICATION_FIELDS
+        )
+    }
@@ -4,47 +4,40 @@
 import frappe
 from frappe import _
 
+from custom_order_workflow.party import get_party_details
+from custom_order_workflow.server_scripts.notification_outbox import record_notification
+from custom_order_workflow.validation import validate_pre_quotation
+
+# Cache hash of role -> emails of enabled users having that role
+ROLE_RECIPIENTS_KEY = "custom_order_workflow:role_recipients"
+
 def validate_pre_quotation_submission(doc, method):
     """Validate pre-quotation before submission to manufacturing"""
-    if doc.status == "Submitted to Manufacturing":
-        # Ensure all required fields are filled
-        if not doc.custom_furniture_items:
-            frappe.throw(_("Please add at least one furniture item before submitting to manufacturing"))
-        
-        # Validate that each item has proper specifications
-        for item in doc.custom_furniture_items:
-            if not item.description:
-                frappe.throw(_("Please provide description for item: {0}").format(item.item_name))
-            
-            if item.item_type == "Table" and not item.specifications_table:
-                frappe.throw(_("Please provide table specifications for: {0}").format(item.item_name))
-            
-            if item.item_type == "Chair" and not item.specifications_chair:
-                frappe.throw(_("Please provide chair specifications for: {0}").format(item.item_name))
+    # Submission rules are part of the single-pass Pre-Quotation validation
+    validate_pre_quotation(doc)
 
 def validate_manufacturing_costing(doc, method):
     """Validate manufacturing costing completion"""
-    if doc.status == "Costing Done":
-        # Ensure all items have estimated costs
-        for item in doc.custom_furniture_items:
-            if not item.estimated_unit_cost or item.estimated_unit_cost <= 0:
-                frappe.throw(_("Please provide estimated unit cost for item: {0}").format(item.item_name))
-        
-        if not doc.estimated_total_cost or doc.estimated_total_cost <= 0:
-            frappe.throw(_("Total estimated cost must be greater than zero"))
+    # Costing rules are part of the single-pass Pre-Quotation validation
+    validate_pre_quotation(doc)
 
 def send_workflow_notifications(doc, method):
-    """Send email notifications for workflow status changes"""
+    """Queue email notifications for workflow status changes"""
     if not doc.has_value_changed("status"):
         return
     
-    if doc.status == "Submitted to Manufacturing":
+    # Emails are rendered and sent by the outbox consumer after commit
+    record_notification(doc)
+
+def send_status_notification(doc, status):
+    """Send the notification for a workflow status"""
+    if status == "Submitted to Manufacturing":
         send_manufacturing_notification(doc)
-    elif doc.status == "Costing Done":
+    elif status == "Costing Done":
         send_costing_complete_notification(doc)
-    elif doc.status == "Approved Internally":
+    elif status == "Approved Internally":
         send_approval_notification(doc)
-    elif doc.status == "Rejected":
+    elif status == "Rejected":
         send_rejection_notification(doc)
 
 def send_manufacturing_notification(doc):
@@ -63,7 +56,7 @@ def send_manufacturing_notification(doc):
         <p>Please review the specifications and provide costing estimates.</p>
         
         <p><a href="/app/pre-quotation/{0}">View Pre-Quotation</a></p>
-        """).format(doc.name, doc.customer, doc.contact_person or "", len(doc.custom_furniture_items))
+        """).format(doc.name, doc.customer, doc.contact_person or "", get_items_count(doc))
         
         frappe.sendmail(
             recipients=manufacturing_users,
@@ -140,25 +133,40 @@ def send_rejection_notification(doc):
             message=message
         )
 
+def get_items_count(doc):
+    """Number of items, also for the lightweight rows the outbox consumer loads"""
+    if doc.get("items_count") is not None:
+        return doc.items_count
+    return len(doc.get("custom_furniture_items") or [])
+
 def get_users_with_role(role):
     """Get list of user emails with specific role"""
-    users = frappe.get_all("Has Role",
-        filters={"role": role, "parenttype": "User"},
-        fields=["parent as user"]
+    return frappe.cache().hget(
+        ROLE_RECIPIENTS_KEY, role, generator=lambda: get_enabled_emails_for_role(role)
     )
-    
-    user_emails = []
-    for user in users:
-        user_doc = frappe.get_doc("User", user.user)
-        if user_doc.email and user_doc.enabled:
-            user_emails.append(user_doc.email)
-    
-    return user_emails
+
+def get_enabled_emails_for_role(role):
+    """Emails of enabled users having a role, in one query"""
+    return frappe.get_all("User",
+        filters=[
+            ["Has Role", "role", "=", role],
+            ["Has Role", "parenttype", "=", "User"],
+            ["User", "enabled", "=", 1],
+            ["User", "email", "is", "set"]
+        ],
+        pluck="email",
+        distinct=True
+    )
+
+def clear_role_recipients_cache(doc=None, method=None):
+    """Invalidate cached role recipients when a User or Has Role changes"""
+    frappe.cache().delete_value(ROLE_RECIPIENTS_KEY)
 
 def auto_create_customer_from_lead(doc, method):
     """Auto-create customer from lead if not exists"""
     if doc.lead and not doc.customer:
-        lead_doc = frappe.get_doc("Lead", doc.lead)
+        # Same cached lookup as PreQuotation.fetch_contact_details
+        lead_doc = get_party_details("Lead", doc.lead)
         
         # Check if customer already exists for this lead
         if lead_doc.customer:
@@ -175,8 +183,9 @@ def auto_create_customer_from_lead(doc, method):
                 customer.insert()
                 
                 # Update lead with customer
-                lead_doc.customer = customer.name
-                lead_doc.save()
+                lead = frappe.get_doc("Lead", doc.lead)
+                lead.customer = customer.name
+                lead.save()
                 
                 # Update pre-quotation with customer
                 doc.customer = customer.name
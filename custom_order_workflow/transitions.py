@@ -0,0 +1,46 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import get_datetime, now_datetime, time_diff_in_seconds
+
+TRANSITION_DOCTYPE = "Pre-Quotation Transition"
+
+# Main path of the Pre-Quotation Workflow, in order
+FUNNEL_STATES = (
+    "Draft",
+    "Submitted to Manufacturing",
+    "Costing Done",
+    "Approved Internally",
+    "Converted to Quotation",
+)
+
+
+def record_transition(doc, method=None):
+    """Log a Pre-Quotation status change; hooked to its save events"""
+
+    if doc.has_value_changed("status"):
+        previous = doc.get_doc_before_save()
+        log_transition(doc, previous.status if previous else None)
+
+
+def log_transition(doc, from_state):
+    """Insert a transition row, timing the stay in from_state since the previous transition"""
+
+    now = now_datetime()
+    entered_on = frappe.db.get_value(
+        TRANSITION_DOCTYPE,
+        {"pre_quotation": doc.name},
+        "transition_date",
+        order_by="transition_date desc",
+    ) or doc.creation or now
+
+    frappe.get_doc({
+        "doctype": TRANSITION_DOCTYPE,
+        "pre_quotation": doc.name,
+        "from_state": from_state,
+        "to_state": doc.status,
+        "transition_date": now,
+        "time_in_from_state": max(time_diff_in_seconds(now, get_datetime(entered_on)), 0) if from_state else 0,
+        "user": frappe.session.user,
+    }).insert(ignore_permissions=True)
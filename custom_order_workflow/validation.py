@@ -0,0 +1,117 @@
+# Copyright (c) 2026, Manus AI and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from custom_order_workflow.costing.specifications import (
+    SPECIFICATION_TABLES,
+    get_item_specification,
+    get_item_specifications,
+)
+
+
+class ValidationContext:
+    """Values shared by the rules of one validation run, loaded on first use"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._specifications = None
+
+    @property
+    def specifications(self):
+        if self._specifications is None:
+            self._specifications = get_item_specifications(self.doc)
+        return self._specifications
+
+
+def has_items(doc, context):
+    return bool(doc.custom_furniture_items)
+
+
+def has_customer_or_lead(doc, context):
+    return bool(doc.customer or doc.lead)
+
+
+def has_estimated_total_cost(doc, context):
+    return flt(doc.estimated_total_cost) > 0
+
+
+def has_item_name(item, context):
+    return bool(item.item_name)
+
+
+def has_quantity(item, context):
+    return flt(item.quantity) > 0
+
+
+def has_description(item, context):
+    return bool(item.description)
+
+
+def has_specification(item, context):
+    if item.get("item_type") not in SPECIFICATION_TABLES:
+        return True
+    return get_item_specification(item, context.specifications) is not None
+
+
+def has_cost(item, context):
+    return flt(item.cost_per_unit) > 0
+
+
+# (workflow states or None for every state, check, message)
+DOCUMENT_RULES = (
+    (None, has_customer_or_lead, "Please select either a Customer or a Lead."),
+    (None, has_items, "Please add at least one item"),
+    (("Costing Done",), has_estimated_total_cost, "Total estimated cost must be greater than zero"),
+)
+
+# Row messages are formatted with the row index and item name
+ROW_RULES = (
+    (None, has_item_name, "Row {0}: Item name is required"),
+    (None, has_quantity, "Row {0}: Quantity must be greater than 0 for item: {1}"),
+    (("Submitted to Manufacturing",), has_description, "Row {0}: Please provide description for item: {1}"),
+    (("Submitted to Manufacturing",), has_specification, "Row {0}: Please provide {2} specifications for: {1}"),
+    (("Costing Done",), has_cost, "Row {0}: Please provide cost per unit for item: {1}"),
+)
+
+# workflow state -> (document rules, row rules)
+_compiled_rules = {}
+
+
+def get_rules(workflow_state):
+    """Rules that apply in a workflow state, compiled once per state"""
+
+    if workflow_state not in _compiled_rules:
+        _compiled_rules[workflow_state] = tuple(
+            tuple((check, message) for states, check, message in rules if not states or workflow_state in states)
+            for rules in (DOCUMENT_RULES, ROW_RULES)
+        )
+
+    return _compiled_rules[workflow_state]
+
+
+def get_violations(doc):
+    """Messages for every rule a Pre-Quotation breaks in its current state"""
+
+    document_rules, row_rules = get_rules(doc.status)
+    context = ValidationContext(doc)
+
+    violations = [_(message) for check, message in document_rules if not check(doc, context)]
+
+    # Every row is checked against all of its rules in a single pass
+    for item in doc.custom_furniture_items:
+        for check, message in row_rules:
+            if not check(item, context):
+                violations.append(_(message).format(item.idx, item.item_name or "", item.get("item_type") or ""))
+
+    return violations
+
+
+def validate_pre_quotation(doc):
+    """Throw once with all rule violations of a Pre-Quotation"""
+
+    violations = get_violations(doc)
+    if violations:
+        frappe.throw(violations, title=_("Please fix the following"), as_list=True)